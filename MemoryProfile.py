@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import time
+import tracemalloc
+
+### Memory Profiling
+
+# resident set size of the whole process, Blender's own allocations included, None where it can't be read
+def ProcessRss():
+	try:
+		if sys.platform=="win32":
+			import ctypes
+			from ctypes import wintypes
+
+			class _Counters(ctypes.Structure):
+				_fields_=[
+					("cb", wintypes.DWORD),
+					("PageFaultCount", wintypes.DWORD),
+					("PeakWorkingSetSize", ctypes.c_size_t),
+					("WorkingSetSize", ctypes.c_size_t),
+					("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+					("QuotaPagedPoolUsage", ctypes.c_size_t),
+					("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+					("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+					("PagefileUsage", ctypes.c_size_t),
+					("PeakPagefileUsage", ctypes.c_size_t),
+				]
+
+			counters=_Counters()
+			counters.cb=ctypes.sizeof(_Counters)
+
+			process=ctypes.windll.kernel32.GetCurrentProcess()
+			if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+				return None
+
+			return counters.WorkingSetSize
+
+		if os.path.exists("/proc/self/statm"):
+			with open("/proc/self/statm", "r") as f:
+				return int(f.read().split()[1])*os.sysconf("SC_PAGE_SIZE")
+
+		# peak rather than current, but better than nothing
+		import resource
+		rss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+		return rss if sys.platform=="darwin" else rss*1024
+	except (OSError, ValueError, ImportError, AttributeError):
+		return None
+
+_MB=1024.0*1024.0
+
+# snapshots the traced Python allocations and the process RSS at every stage boundary
+# each stage gets its peak and retained allocations, how RSS changed, and the source lines that allocated the most in it
+class MemoryProfiler(object):
+	def __init__(self, top_count=10):
+		self.top_count=top_count
+		self.prefix="" # put in front of stage names, e.g. the world's name when importing several
+
+		self.stages=[]
+
+		self._current=None
+		self._started_tracing=False
+
+	def start(self):
+		if not tracemalloc.is_tracing():
+			tracemalloc.start()
+			self._started_tracing=True
+
+	def stop(self):
+		self.finish()
+
+		if self._started_tracing:
+			tracemalloc.stop()
+			self._started_tracing=False
+
+	# ends the running stage and starts the next one
+	def mark(self, name):
+		self.finish()
+
+		snapshot=self._snapshot()
+
+		# older Pythons can't reset the peak, so there it's the peak since tracing started
+		if hasattr(tracemalloc, "reset_peak"):
+			tracemalloc.reset_peak()
+
+		self._current={
+			"name": self.prefix+name,
+			"snapshot": snapshot,
+			"traced": tracemalloc.get_traced_memory()[0], # taken after the snapshot, so the snapshot itself isn't counted
+			"rss": ProcessRss(),
+			"time": time.perf_counter(),
+		}
+
+	def _snapshot(self):
+		return tracemalloc.take_snapshot().filter_traces([
+			tracemalloc.Filter(False, tracemalloc.__file__),
+			tracemalloc.Filter(False, __file__),
+			tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+			tracemalloc.Filter(False, "<unknown>"),
+		])
+
+	# ends the running stage, if there is one
+	def finish(self):
+		if self._current is None:
+			return
+
+		current, peak=tracemalloc.get_traced_memory()
+		rss=ProcessRss()
+		seconds=time.perf_counter()-self._current["time"]
+
+		stats=self._snapshot().compare_to(self._current["snapshot"], "lineno")
+		stats=sorted(stats, key=lambda stat: stat.size_diff, reverse=True)[:self.top_count]
+
+		rss_before=self._current["rss"]
+
+		self.stages.append({
+			"stage": self._current["name"],
+			"seconds": seconds,
+			"peak": peak-self._current["traced"],
+			"peak_is_cumulative": not hasattr(tracemalloc, "reset_peak"),
+			"retained": current-self._current["traced"],
+			"rss_before": rss_before,
+			"rss_after": rss,
+			"rss_change": rss-rss_before if rss is not None and rss_before is not None else None,
+			"top": [{"site": "{}:{}".format(stat.traceback[0].filename, stat.traceback[0].lineno), "size": stat.size_diff, "count": stat.count_diff} for stat in stats if stat.size_diff>0],
+		})
+
+		self._current=None
+
+	def lines(self):
+		lines=[]
+
+		for stage in self.stages:
+			line="{}: peak {:.1f} MB, retained {:.1f} MB".format(stage["stage"], stage["peak"]/_MB, stage["retained"]/_MB)
+
+			if stage["rss_change"] is not None:
+				line+=", RSS {:+.1f} MB ({:.1f} MB)".format(stage["rss_change"]/_MB, stage["rss_after"]/_MB)
+
+			if len(stage["top"])>0:
+				line+=", most from {}".format(os.path.basename(stage["top"][0]["site"]))
+
+			lines.append(line)
+
+		return lines
+
+	def save(self, filepath):
+		with open(filepath, "w") as f:
+			json.dump({"stages": self.stages}, f, indent="\t")
+
+# stage boundaries cost nothing when profiling is off
+def Mark(profiler, name):
+	if profiler is not None:
+		profiler.mark(name)
\ No newline at end of file
@@ -0,0 +1,107 @@
+import bpy
+import numpy as np
+
+# builds a mesh straight from flat arrays with foreach_set instead of going through bmesh one vertex and face at a time
+def BuildMesh(name, positions, loop_vertices, loop_starts, loop_totals, uvs=None, material_indices=None):
+	mesh=bpy.data.meshes.new(name)
+
+	mesh.vertices.add(len(positions))
+	mesh.vertices.foreach_set("co", np.ascontiguousarray(positions, dtype=np.float32).ravel())
+
+	mesh.loops.add(len(loop_vertices))
+	mesh.loops.foreach_set("vertex_index", np.ascontiguousarray(loop_vertices, dtype=np.int32))
+
+	mesh.polygons.add(len(loop_starts))
+	mesh.polygons.foreach_set("loop_start", np.ascontiguousarray(loop_starts, dtype=np.int32))
+
+	try:
+		mesh.polygons.foreach_set("loop_total", np.ascontiguousarray(loop_totals, dtype=np.int32))
+	except (AttributeError, TypeError): # read only in newer versions, worked out from loop_start there
+		pass
+
+	if uvs is not None:
+		uv_layer=mesh.uv_layers.new()
+		uv_layer.data.foreach_set("uv", np.ascontiguousarray(uvs, dtype=np.float32).ravel())
+
+	if material_indices is not None:
+		mesh.polygons.foreach_set("material_index", np.ascontiguousarray(material_indices, dtype=np.int32))
+
+	mesh.validate(clean_customdata=False)
+	mesh.update(calc_edges=True)
+
+	return mesh
+
+# cells are hashed to a single integer, two cells hashing the same only give extra candidates that the distance check throws out
+_CellHashPrimes=np.array([73856093, 19349663, 83492791], dtype=np.int64)
+
+def _HashCells(cells):
+	cells=cells*_CellHashPrimes
+	return cells[:, 0]^cells[:, 1]^cells[:, 2]
+
+# grids of cells twice the weld distance, shifted by half a cell along each combination of axes
+# two vertices within the distance can only be split by one boundary per axis, so they share a cell in at least one of the grids
+_GridShifts=np.array([(x, y, z) for x in (0.0, 0.5) for y in (0.0, 0.5) for z in (0.0, 0.5)])
+
+# every pair of vertices sharing a cell in any of the grids, pairs show up once per grid they share a cell in
+def _CandidatePairs(positions, distance):
+	count=len(positions)
+	indices=np.arange(count)
+
+	firsts=[]
+	seconds=[]
+
+	for shift in _GridShifts:
+		cell_keys=_HashCells(np.floor((positions/(distance*2.0))+shift).astype(np.int64))
+
+		order=np.argsort(cell_keys, kind="stable")
+		sorted_keys=cell_keys[order]
+
+		# how many vertices after each one in the sorted order share its cell
+		later=np.searchsorted(sorted_keys, sorted_keys, side="right")-indices-1
+
+		total=later.sum()
+		if total==0:
+			continue
+
+		first=np.repeat(indices, later)
+		second=first+1+(np.arange(total)-np.repeat(np.cumsum(later)-later, later))
+
+		firsts.append(order[first])
+		seconds.append(order[second])
+
+	if len(firsts)==0:
+		return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+	return np.concatenate(firsts), np.concatenate(seconds)
+
+# joins the vertices of every pair, each vertex ends up pointing at the lowest index of its group
+def _JoinPairs(count, first, second):
+	labels=np.arange(count)
+
+	while True:
+		previous=labels.copy()
+
+		np.minimum.at(labels, first, labels[second])
+		np.minimum.at(labels, second, labels[first])
+
+		labels=labels[labels]
+
+		if np.array_equal(labels, previous):
+			return labels
+
+# merges vertices within the given distance of each other whose extra per vertex attributes are all within their tolerance too
+# returns the kept positions, the remapped loop vertices and how many vertices were removed
+def WeldVertices(positions, loop_vertices, distance, attributes=()):
+	first, second=_CandidatePairs(positions, distance)
+
+	close=np.sum((positions[first]-positions[second])**2, axis=1)<=distance*distance
+	for values, tolerance in attributes:
+		close&=np.all(np.abs(values[first]-values[second])<=tolerance, axis=1)
+
+	labels=_JoinPairs(len(positions), first[close], second[close])
+
+	# the first vertex of each group is kept, in the original order
+	kept=labels==np.arange(len(positions))
+	new_index=np.cumsum(kept)-1
+
+	return positions[kept], new_index[labels][loop_vertices], len(positions)-int(kept.sum())
\ No newline at end of file
@@ -0,0 +1,203 @@
+import hashlib
+import bpy
+
+### Re-importing
+
+# custom properties every imported datablock is tagged with, so a later import can find it again
+_KeyProperty="jupex_key"
+_HashProperty="jupex_hash"
+
+# bpy.data collection each object type's data lives in
+_DataCollections={
+	"MESH": "meshes",
+	"LIGHT": "lights",
+}
+
+# names aren't unique within a world, repeats are told apart by how many came before them
+class UniqueKeys(object):
+	def __init__(self, prefix):
+		self.prefix=prefix
+		self.counts={}
+
+	def key(self, name):
+		count=self.counts.get(name, 0)
+		self.counts[name]=count+1
+
+		return "{}:{}:{}".format(self.prefix, count, name)
+
+def SourceHash(*buffers):
+	digest=hashlib.blake2b(digest_size=16)
+
+	for buffer in buffers:
+		digest.update(buffer.encode() if isinstance(buffer, str) else buffer)
+
+	return digest.hexdigest()
+
+# every world gets a collection of its own tagged with where it was read from, a re-import only looks inside that one
+def WorldCollection(parent, source, name, reuse):
+	key="world:"+source
+
+	if reuse:
+		for child in parent.children:
+			if child.get(_KeyProperty)==key:
+				return child
+
+	collection=bpy.data.collections.new(name)
+	collection[_KeyProperty]=key
+	parent.children.link(collection)
+
+	return collection
+
+# Collection.children_recursive is only in newer versions
+def _ChildCollections(collection):
+	for child in collection.children:
+		yield child
+		yield from _ChildCollections(child)
+
+def _RemoveData(data, obj_type):
+	if data is not None and data.users==0 and obj_type in _DataCollections:
+		getattr(bpy.data, _DataCollections[obj_type]).remove(data)
+
+def _RemoveObject(obj):
+	data, obj_type=obj.data, obj.type
+	bpy.data.objects.remove(obj)
+
+	_RemoveData(data, obj_type)
+
+# datablocks from an earlier import of the same world, looked up by key (surface index, BSP name, object name, material path)
+# objects whose source bytes hash the same are reused as they are, changed ones get new data swapped into the existing object
+class ReimportIndex(object):
+	def __init__(self, collection=None):
+		self.objects={}
+		self.collections={}
+		self.materials={}
+
+		self.claimed=set()
+
+		self.reused=0
+		self.rebuilt=0
+		self.removed=0
+
+		# nothing to match against for a fresh import, everything still gets tagged
+		if collection is None:
+			return
+
+		for child in _ChildCollections(collection):
+			if _KeyProperty in child:
+				self.collections[child[_KeyProperty]]=child
+
+		for obj in collection.all_objects:
+			if _KeyProperty in obj:
+				self.objects[obj[_KeyProperty]]=obj
+
+		for material in bpy.data.materials:
+			if _KeyProperty in material:
+				self.materials[material[_KeyProperty]]=material
+
+	def collection(self, key, name, parent):
+		collection=self.collections.get(key)
+
+		if collection is None:
+			collection=bpy.data.collections.new(name)
+			collection[_KeyProperty]=key
+			parent.children.link(collection)
+
+			self.collections[key]=collection
+
+		return collection
+
+	def _place(self, obj, collection):
+		if collection in obj.users_collection:
+			return
+
+		for old in list(obj.users_collection):
+			old.objects.unlink(obj)
+
+		collection.objects.link(obj)
+
+	# the earlier object if its source hasn't changed, None if it has to be built again
+	def reuse(self, key, source_hash, collection):
+		obj=self.objects.get(key)
+
+		if obj is None or obj.get(_HashProperty)!=source_hash:
+			return None
+
+		self.claimed.add(key)
+		self.reused+=1
+
+		self._place(obj, collection)
+
+		return obj
+
+	# takes over a freshly built and linked object, an earlier object with the same key keeps its identity and gets the new data
+	def store(self, key, source_hash, new_obj):
+		old=self.objects.get(key)
+
+		self.claimed.add(key)
+		self.rebuilt+=1
+
+		obj=new_obj
+
+		if old is not None and old.type==new_obj.type:
+			old_data=old.data
+
+			old.data=new_obj.data
+			old.rotation_mode=new_obj.rotation_mode
+			old.matrix_basis=new_obj.matrix_basis.copy()
+
+			if len(new_obj.users_collection)>0:
+				self._place(old, new_obj.users_collection[0])
+
+			bpy.data.objects.remove(new_obj)
+			_RemoveData(old_data, old.type)
+
+			obj=old
+		elif old is not None:
+			_RemoveObject(old)
+
+		obj[_KeyProperty]=key
+		obj[_HashProperty]=source_hash
+
+		self.objects[key]=obj
+
+		return obj
+
+	# an earlier object this import leaves alone on purpose, prune() won't remove it
+	def keep(self, key):
+		if key not in self.objects:
+			return False
+
+		self.claimed.add(key)
+
+		return True
+
+	# removes the objects of a section that weren't in the file this time
+	def prune(self, prefix):
+		for key in [key for key in self.objects if key.startswith(prefix) and key not in self.claimed]:
+			_RemoveObject(self.objects.pop(key))
+			self.removed+=1
+
+	def material(self, path, source_hash):
+		material=self.materials.get(path)
+
+		if material is None or material.get(_HashProperty)!=source_hash:
+			return None
+
+		return material
+
+	# a changed material replaces the earlier one everywhere it was used
+	def storeMaterial(self, path, source_hash, new_material):
+		old=self.materials.get(path)
+
+		if old is not None and old!=new_material:
+			name=old.name
+
+			old.user_remap(new_material)
+			bpy.data.materials.remove(old)
+
+			new_material.name=name
+
+		new_material[_KeyProperty]=path
+		new_material[_HashProperty]=source_hash
+
+		self.materials[path]=new_material
\ No newline at end of file
@@ -1,14 +1,19 @@
 import os
 import bpy
+import fnmatch
 import bpy_extras
 import bmesh
 from mathutils import Vector
 from enum import IntEnum
 
 import struct
+import numpy as np
 from typing import List
 
 from .utils import ReadRaw, ReadVector, ReadLTString
+from .MeshBuilder import BuildMesh, WeldVertices
+from .Reimport import SourceHash
+from .MemoryProfile import Mark
 
 ### Materials
 
@@ -85,7 +90,7 @@ class Material(object):
 
 		self.fx=[]
 
-	def read(self, file, game_data_folder): # FIXME: game_data_folder could be dealt with much better
+	def read(self, file, game_data_folder, create=True, textures=None): # FIXME: game_data_folder could be dealt with much better
 		self.name=os.path.splitext(os.path.basename(file.name))[0]
 
 		magic, count=ReadRaw(file, "4sI")
@@ -104,36 +109,131 @@ class Material(object):
 
 			self.fx.append(new_fx)
 
-		self.createMaterial(game_data_folder)
+		if create:
+			self.createMaterial(game_data_folder, textures)
 
-	def createMaterial(self, game_data_folder):
-		new_material=bpy.data.materials.new(self.name)
-		new_material.use_nodes=True
+	# the node tree is copied from a template shared by every material with the same shader and maps,
+	# only the images and scalar inputs are set per material
+	def createMaterial(self, game_data_folder, textures=None):
+		fx=self.fx[0]
+		maps=tuple(name for name, _, _ in _TextureMaps if isinstance(fx.definitions.get(name, (None, None))[1], str))
 
-		new_material.blend_method="OPAQUE"
-		new_material.use_backface_culling=True
+		new_material=_MaterialTemplate(fx.file_name, maps).copy()
+		new_material.name=self.name
 
-		#if self.blend==True:
-		#	new_material.blend_method="BLEND"
+		nodes=new_material.node_tree.nodes
+		out_node=nodes["Principled BSDF"]
 
-		out_node=new_material.node_tree.nodes["Principled BSDF"]
-		texture_image=new_material.node_tree.nodes.new("ShaderNodeTexImage")
-		new_material.node_tree.links.new(out_node.inputs["Base Color"], texture_image.outputs["Color"])
-		new_material.node_tree.links.new(out_node.inputs["Alpha"], texture_image.outputs["Alpha"])
+		for name, _, colour in _TextureMaps:
+			if name not in maps:
+				continue
 
-		# set some defaults
-		out_node.inputs["Specular"].default_value=0.0 # 64.0/255.0
+			try:
+				nodes[name].image=_LoadImage(os.path.join(game_data_folder, fx.getDefinition(name)), textures)
 
-		try:
-			texture_name=self.fx[0].getDefinition("tDiffuseMap")
-			texture_image.image=bpy.data.images.load(filepath=os.path.join(game_data_folder, texture_name))
+				if not colour:
+					nodes[name].image.colorspace_settings.name="Non-Color"
+			except:
+				pass
 
-			out_node.inputs["Specular"].default_value=self.fx[0].getDefinition("fMaxSpecularPower")/255.0
-		except:
-			pass
+		if "tSpecularMap" not in maps and "fMaxSpecularPower" in fx.definitions:
+			_FindInput(out_node, "Specular IOR Level", "Specular").default_value=fx.getDefinition("fMaxSpecularPower")/255.0
+
+		if "tNormalMap" in maps and "fNormalMapScale" in fx.definitions:
+			nodes["Normal Map"].inputs["Strength"].default_value=fx.getDefinition("fNormalMapScale")
 
 		self.material=new_material
 
+# texture definition, Principled BSDF inputs it drives (newest Blender name first), whether it's colour data
+_TextureMaps=[
+	("tDiffuseMap", ("Base Color",), True),
+	("tSpecularMap", ("Specular IOR Level", "Specular"), False),
+	("tEmissiveMap", ("Emission Color", "Emission"), True),
+	("tNormalMap", None, False),
+]
+
+# (fx file name, maps) -> template material
+_MaterialTemplates={}
+
+# textures is a TextureBudget when only downscaled proxies should be loaded
+def _LoadImage(filepath, textures):
+	if textures is not None:
+		return textures.load(filepath)
+
+	return bpy.data.images.load(filepath=filepath, check_existing=True)
+
+def _FindInput(node, *names):
+	for name in names:
+		if name in node.inputs:
+			return node.inputs[name]
+
+	return None
+
+def _MaterialTemplate(fx_name, maps):
+	key=(fx_name, maps)
+	template=_MaterialTemplates.get(key)
+
+	try:
+		if template is not None and template.node_tree is not None:
+			return template
+	except ReferenceError: # removed since it was made
+		pass
+
+	template=bpy.data.materials.new("Template {}".format(fx_name))
+	template.use_nodes=True
+
+	template.blend_method="OPAQUE"
+	template.use_backface_culling=True
+
+	nodes=template.node_tree.nodes
+	links=template.node_tree.links
+
+	out_node=nodes["Principled BSDF"]
+
+	# set some defaults
+	_FindInput(out_node, "Specular IOR Level", "Specular").default_value=0.0 # 64.0/255.0
+
+	for i, (name, inputs, colour) in enumerate(_TextureMaps):
+		if name not in maps:
+			continue
+
+		texture_image=nodes.new("ShaderNodeTexImage")
+		texture_image.name=name
+		texture_image.location=(out_node.location[0]-600, out_node.location[1]-i*300)
+
+		if inputs is None:
+			normal_map=nodes.new("ShaderNodeNormalMap")
+			normal_map.location=(out_node.location[0]-250, out_node.location[1]-i*300)
+			links.new(normal_map.inputs["Color"], texture_image.outputs["Color"])
+			links.new(out_node.inputs["Normal"], normal_map.outputs["Normal"])
+			continue
+
+		links.new(_FindInput(out_node, *inputs), texture_image.outputs["Color"])
+
+		if name=="tDiffuseMap":
+			links.new(out_node.inputs["Alpha"], texture_image.outputs["Alpha"])
+		elif name=="tEmissiveMap" and "Emission Strength" in out_node.inputs:
+			out_node.inputs["Emission Strength"].default_value=1.0
+
+	_MaterialTemplates[key]=template
+
+	return template
+
+# the templates are only needed while materials are copied from them, none of them is left in the file after an import
+def RemoveMaterialTemplates():
+	for template in _MaterialTemplates.values():
+		try:
+			if template.users==0:
+				bpy.data.materials.remove(template)
+		except ReferenceError: # already gone with an undo or a file load
+			pass
+
+	_MaterialTemplates.clear()
+
+# after a file load or an undo the templates held here aren't valid datablocks anymore
+def ForgetMaterialTemplates():
+	_MaterialTemplates.clear()
+
 ### Render Section
 
 class Vertex(object):
@@ -165,6 +265,15 @@ class VertexPropertyLocation(IntEnum):
 	Binormal=7
 	Colour=10
 
+# size in bytes of each property format
+_VertexPropertySizes={
+	VertexPropertyFormat.Float_x2: 8,
+	VertexPropertyFormat.Float_x3: 12,
+	VertexPropertyFormat.Float_x4: 16,
+	VertexPropertyFormat.Byte_x4: 4,
+	VertexPropertyFormat.SkeletalIndex: 4,
+}
+
 class VertexProperty(object):
 	def __init__(self):
 		self.format=-1
@@ -192,6 +301,18 @@ class VertexDefinition(object):
 
 			self.properties.append(prop)
 
+	# byte offset of the position inside a vertex, None if there isn't a usable one
+	def positionOffset(self):
+		offset=0
+
+		for prop in self.properties:
+			if prop.location==VertexPropertyLocation.Position and prop.id==0:
+				return offset if prop.format==VertexPropertyFormat.Float_x3 else None
+
+			offset+=_VertexPropertySizes.get(prop.format, 0)
+
+		return None
+
 	def readVertex(self, vertex_data) -> Vertex:
 		temp_vert=Vertex()
 
@@ -247,6 +368,8 @@ class VertexDefinition(object):
 
 class RenderSurface(object):
 	def __init__(self):
+		self.index=0 # position in the file's surface list, stays the same however the surfaces get filtered
+
 		self.vertices_start=0
 		self.vertices_count=0
 		self.vertex_size=0
@@ -257,12 +380,15 @@ class RenderSurface(object):
 
 		self.material_id=0
 		#self.unk=0
+		self.vertex_definition_id=0
 		self.vertex_definition=None
 
+		self.source_hash=None
+
 		self.vertices=[]
 		self.indices=[]
 
-	def read(self, file, vertex_defs, vertex_data, triangulation_data):
+	def read(self, file, vertex_defs):
 		raw=ReadRaw(file, "9I")
 
 		self.vertices_start=raw[0]
@@ -274,8 +400,11 @@ class RenderSurface(object):
 		self.material_id=raw[6]
 		#self.unk=raw[7]
 
+		self.vertex_definition_id=raw[8]
 		self.vertex_definition=vertex_defs[raw[8]]
 
+	# only the header is read up front, vertices and triangles are decoded on demand so they can be released after building
+	def decode(self, vertex_data, triangulation_data):
 		buffer_offset=self.vertices_start*self.vertex_size
 		buffer_end=buffer_offset+(self.vertices_count*self.vertex_size)
 		self.readVertices(vertex_data[buffer_offset:buffer_end])
@@ -284,6 +413,48 @@ class RenderSurface(object):
 		buffer_end=buffer_offset+(self.indices_count*6)
 		self.readTriangulations(triangulation_data[buffer_offset:buffer_end])
 
+	def release(self):
+		self.vertices=[]
+		self.indices=[]
+
+	# hash of everything the surface is built from, to tell whether a re-import has to rebuild it
+	def sourceHash(self, vertex_data, triangulation_data, mat_name, settings):
+		vertex_offset=self.vertices_start*self.vertex_size
+		indices_offset=self.indices_start*2
+
+		return SourceHash(
+			vertex_data[vertex_offset:vertex_offset+(self.vertices_count*self.vertex_size)],
+			triangulation_data[indices_offset:indices_offset+(self.indices_count*6)],
+			repr((self.vertex_size, self.indices_offset, self.vertex_definition_id, mat_name)),
+			settings
+		)
+
+	# positions and triangles as arrays straight from the blocks, in the same space and winding as the built meshes
+	def triangleArrays(self, vertex_data, triangulation_data):
+		offset=self.vertex_definition.positionOffset()
+		if offset is None or self.vertices_count==0:
+			return np.zeros((0, 3), dtype=np.float32), np.zeros((0, 3), dtype=np.int64)
+
+		positions=np.ndarray((self.vertices_count, 3), dtype="<f4", buffer=vertex_data, offset=(self.vertices_start*self.vertex_size)+offset, strides=(self.vertex_size, 4))
+		positions=positions[:, [0, 2, 1]]
+
+		triangles=np.frombuffer(triangulation_data, dtype="<u2", count=self.indices_count*3, offset=self.indices_start*2).reshape(-1, 3).astype(np.int64)
+		triangles=triangles[:, ::-1]-self.indices_offset
+		triangles=triangles[np.all((triangles>=0) & (triangles<self.vertices_count), axis=1)]
+
+		return positions, triangles
+
+	# bounding box straight from the positions in the vertex block, without decoding the vertices
+	def bounds(self, vertex_data):
+		offset=self.vertex_definition.positionOffset()
+		if offset is None or self.vertices_count==0:
+			return None
+
+		positions=np.ndarray((self.vertices_count, 3), dtype="<f4", buffer=vertex_data, offset=(self.vertices_start*self.vertex_size)+offset, strides=(self.vertex_size, 4))
+		positions=positions[:, [0, 2, 1]] # same swizzle as readVertex
+
+		return positions.min(axis=0), positions.max(axis=0)
+
 	def readVertices(self, vertex_data):
 		for i in range(self.vertices_count):
 			idx=i*self.vertex_size
@@ -303,13 +474,84 @@ class RenderSurface(object):
 
 			self.indices.append(verts)
 
-def ReadRenderMesh(file, section_counts, options):
-	_, surface_count, material_count=ReadRaw(file, "3I")
-	block_sizes=ReadRaw(file, "2I")
+# material paths are always windows style
+def _MaterialBaseName(mat_name):
+	return os.path.splitext(os.path.basename(mat_name.replace("\\", "/")))[0]
+
+def _MatchesAny(patterns, names):
+	return any(fnmatch.fnmatchcase(name.lower(), pattern) for pattern in patterns for name in names)
+
+def _ParsePatterns(text):
+	return [i.strip().lower() for i in text.split(",") if i.strip()]
+
+# include/exclude rules checked against the surface headers, before anything of the surface is decoded
+# patterns are comma separated, case insensitive globs, an empty include list lets everything through
+class SurfaceFilter(object):
+	def __init__(self):
+		self.include_materials=[] # matched against both the material path and its name
+		self.exclude_materials=[]
+		self.include_fx=[] # matched against the material's shader file names
+		self.exclude_fx=[]
+		self.exclude_vertex_definitions=[]
+		self.min_triangles=0
+		self.max_triangles=0 # 0 for no limit
+
+		self._fx_names={}
+
+	def setPatterns(self, include_materials="", exclude_materials="", include_fx="", exclude_fx=""):
+		self.include_materials=_ParsePatterns(include_materials)
+		self.exclude_materials=_ParsePatterns(exclude_materials)
+		self.include_fx=_ParsePatterns(include_fx)
+		self.exclude_fx=_ParsePatterns(exclude_fx)
+
+	def isEmpty(self):
+		return not any((self.include_materials, self.exclude_materials, self.include_fx, self.exclude_fx, self.exclude_vertex_definitions, self.min_triangles, self.max_triangles))
+
+	# only the material's shader list is read, and only when there are fx rules
+	def _fxNames(self, mat_name, game_data_folder):
+		if mat_name not in self._fx_names:
+			material=Material()
+
+			try:
+				with open(os.path.join(game_data_folder, mat_name), "rb") as mat_file:
+					material.read(mat_file, game_data_folder, create=False)
+			except Exception:
+				pass
+
+			self._fx_names[mat_name]=[fx.file_name for fx in material.fx]
+
+		return self._fx_names[mat_name]
+
+	def accepts(self, surface, mat_name, game_data_folder):
+		if surface.indices_count<self.min_triangles:
+			return False
+
+		if self.max_triangles>0 and surface.indices_count>self.max_triangles:
+			return False
+
+		if surface.vertex_definition_id in self.exclude_vertex_definitions:
+			return False
+
+		mat_names=[mat_name, _MaterialBaseName(mat_name)] if mat_name else [""]
+
+		if len(self.include_materials)>0 and not _MatchesAny(self.include_materials, mat_names):
+			return False
+
+		if _MatchesAny(self.exclude_materials, mat_names):
+			return False
+
+		if len(self.include_fx)>0 or len(self.exclude_fx)>0:
+			fx_names=self._fxNames(mat_name, game_data_folder) if mat_name else []
+
+			if len(self.include_fx)>0 and not _MatchesAny(self.include_fx, fx_names):
+				return False
 
-	vertex_data=file.read(block_sizes[0])
-	triangulation_data=file.read(block_sizes[1])
+			if _MatchesAny(self.exclude_fx, fx_names):
+				return False
 
+		return True
+
+def ReadSurfaceHeaders(file):
 	vertex_def_count=ReadRaw(file, "I")[0]
 	vertex_defs=[]
 	for i in range(vertex_def_count):
@@ -321,11 +563,14 @@ def ReadRenderMesh(file, section_counts, options):
 	render_surfaces=[]
 	for i in range(render_surface_count):
 		surface=RenderSurface()
-		surface.read(file, vertex_defs, vertex_data, triangulation_data)
+		surface.read(file, vertex_defs)
+		surface.index=i
 		render_surfaces.append(surface)
 
-	materials=[]
-	material_errors=[]
+	return render_surfaces
+
+def ReadMaterialNames(file, material_count, material_errors):
+	material_names=[]
 	for i in range(material_count):
 		mat_name=None
 
@@ -337,30 +582,306 @@ def ReadRenderMesh(file, section_counts, options):
 			#mat_name=r"Materials\Default.Mat00"
 			pass
 
+		material_names.append(mat_name)
+
+	return material_names
+
+# the surface headers and material names only, the vertex and triangle blocks are skipped over
+def ReadRenderHeaders(file):
+	_, surface_count, material_count=ReadRaw(file, "3I")
+	block_sizes=ReadRaw(file, "2I")
+
+	file.seek(block_sizes[0]+block_sizes[1], os.SEEK_CUR)
+
+	render_surfaces=ReadSurfaceHeaders(file)
+
+	return render_surfaces, ReadMaterialNames(file, material_count, [])
+
+def ReadRenderMesh(file, section_counts, options):
+	Mark(options.Profiler, "render blocks")
+
+	_, surface_count, material_count=ReadRaw(file, "3I")
+	block_sizes=ReadRaw(file, "2I")
+
+	# memoryviews so slicing out each surface doesn't copy the blocks
+	vertex_data=memoryview(file.read(block_sizes[0]))
+	triangulation_data=memoryview(file.read(block_sizes[1]))
+
+	render_surfaces=ReadSurfaceHeaders(file)
+
+	material_errors=[]
+	material_names=ReadMaterialNames(file, material_count, material_errors)
+
+	# surfaces the filter leaves out keep whatever an earlier import built for them
+	skipped=[]
+	if options.SurfaceFilter is not None and not options.SurfaceFilter.isEmpty():
+		accepted=[]
+		for surface in render_surfaces:
+			(accepted if options.SurfaceFilter.accepts(surface, material_names[surface.material_id], options.GameDataFolder) else skipped).append(surface)
+
+		render_surfaces=accepted
+
+	# materials no remaining surface uses aren't loaded
+	used_materials=set(surface.material_id for surface in render_surfaces)
+
+	Mark(options.Profiler, "materials and textures")
+
+	materials=[]
+	for i, mat_name in enumerate(material_names):
 		if options.ImportMaterials:
+			if i not in used_materials:
+				materials.append(Material())
+				continue
+
+			# batch imports share materials between worlds
+			if options.MaterialCache is not None and mat_name in options.MaterialCache:
+				materials.append(options.MaterialCache[mat_name])
+				continue
+
 			material=Material()
 			try:
-				material.read(open(os.path.join(options.GameDataFolder, mat_name), "rb"), options.GameDataFolder)
+				with open(os.path.join(options.GameDataFolder, mat_name), "rb") as mat_file:
+					source_hash=SourceHash(mat_file.read())
+					mat_file.seek(0)
+
+					# an unchanged material from an earlier import is used as it is
+					existing=options.ReimportIndex.material(mat_name, source_hash)
+					if existing is not None:
+						material.name=os.path.splitext(os.path.basename(mat_file.name))[0]
+						material.material=existing
+					else:
+						material.read(mat_file, options.GameDataFolder, textures=options.TextureBudget)
+						options.ReimportIndex.storeMaterial(mat_name, source_hash, material.material)
 			except Exception as e:
 				print(repr(e))
 				material_errors.append(mat_name)
 				pass
 
 			materials.append(material)
+
+			if options.MaterialCache is not None:
+				options.MaterialCache[mat_name]=material
 		else:
 			materials=None # FIXME: this is a terrible way to do it
 
-	collection=bpy.data.collections.new("Render Surfaces")
-	bpy.context.scene.collection.children.link(collection)
+	collection=options.ReimportIndex.collection("render_surfaces", "Render Surfaces", options.WorldCollection)
 
-	for i in render_surfaces:
-		TestRenderSurface(i, materials, collection)
+	# decoding each surface's vertex lists and building its mesh are interleaved, the top allocation sites tell them apart
+	Mark(options.Profiler, "render surfaces")
+
+	# the same bytes built with other settings make different objects
+	settings=repr((options.ImportMaterials, options.WeldVertices, options.WeldDistance, options.WeldNormals, options.WeldUvs, options.GridCells, options.GridMode, options.MergeCells))
+
+	for surface in render_surfaces:
+		surface.source_hash=surface.sourceHash(vertex_data, triangulation_data, material_names[surface.material_id], settings)
+
+	# shadow volumes aren't visible geometry, so they're left out of queries
+	if options.Geometry is not None:
+		for surface in render_surfaces:
+			if _MaterialBaseName(material_names[surface.material_id] or "").lower()!="shadowvolume":
+				options.Geometry.addTriangles(*surface.triangleArrays(vertex_data, triangulation_data), "surface:{}".format(surface.index))
+
+	if options.GridCells>0:
+		BuildGridCells(render_surfaces, skipped, vertex_data, triangulation_data, materials, collection, options)
+	elif options.WeldVertices:
+		# without cells the whole world is one group to weld across
+		surfaces=BuildMergedGroup(render_surfaces, len(skipped)>0, "Welded Surfaces", vertex_data, triangulation_data, materials, collection, options)
+		BuildRenderSurfaces(surfaces, vertex_data, triangulation_data, materials, collection, options)
+	else:
+		BuildRenderSurfaces(render_surfaces, vertex_data, triangulation_data, materials, collection, options)
+
+	for surface in skipped:
+		options.ReimportIndex.keep("surface:{}".format(surface.index))
+
+	# surfaces from an earlier import that weren't built this time
+	options.ReimportIndex.prune("surface:")
+	options.ReimportIndex.prune("cell:")
+
+	if options.WeldVertices:
+		print("Welded {} vertices".format(options.WeldedVertexCount))
 
 	#for i in range(section_counts[0]):
 	#	ReadRenderTree(file)
 
 	print(material_errors)
 
+# yields each surface decoded, and frees the decoded data again once the consumer asks for the next one
+def IterRenderSurfaces(render_surfaces, vertex_data, triangulation_data):
+	for surface in render_surfaces:
+		surface.decode(vertex_data, triangulation_data)
+		yield surface
+		surface.release()
+
+# inner cell boundaries along each axis, either evenly over the world bounds or so each cell gets about as many surfaces
+def _GridEdges(centers, options):
+	fractions=np.linspace(0.0, 1.0, options.GridCells+1)[1:-1]
+
+	if options.GridMode=="ADAPTIVE":
+		return [np.quantile(centers[:, axis], fractions) for axis in range(3)]
+
+	bounds_min, bounds_max=options.WorldBounds if options.WorldBounds is not None else (centers.min(axis=0), centers.max(axis=0))
+
+	return [bounds_min[axis]+((bounds_max[axis]-bounds_min[axis])*fractions) for axis in range(3)]
+
+# surfaces are sorted into cells from their bounds before anything is decoded, then built a cell at a time
+# skipped surfaces still count for the layout, so the cells stay the same whatever the filter leaves out
+def BuildGridCells(render_surfaces, skipped, vertex_data, triangulation_data, materials, collection, options):
+	placed=[]
+	centers=[]
+	unplaced=[]
+
+	skipped_indices=set(surface.index for surface in skipped)
+
+	for surface in render_surfaces+skipped:
+		bounds=surface.bounds(vertex_data)
+
+		if bounds is None:
+			if surface.index not in skipped_indices:
+				unplaced.append(surface)
+		else:
+			placed.append(surface)
+			centers.append((bounds[0]+bounds[1])*0.5)
+
+	cells={}
+
+	if len(placed)>0:
+		centers=np.array(centers)
+		edges=_GridEdges(centers, options)
+
+		cell_ids=np.stack([np.searchsorted(edges[axis], centers[:, axis], side="right") for axis in range(3)], axis=1)
+
+		for surface, cell_id in zip(placed, cell_ids.tolist()):
+			cells.setdefault(tuple(cell_id), []).append(surface)
+
+	for cell_id in sorted(cells):
+		cell_name="Cell {}_{}_{}".format(*cell_id)
+		key="cell:{}".format(cell_name)
+
+		surfaces=[i for i in cells[cell_id] if i.index not in skipped_indices]
+		partial=len(surfaces)<len(cells[cell_id])
+
+		if len(surfaces)==0:
+			options.ReimportIndex.keep(key)
+			continue
+
+		cell_collection=options.ReimportIndex.collection(key, cell_name, collection)
+
+		# welding across surfaces needs them in one mesh, so a welded cell is always merged
+		if options.MergeCells or options.WeldVertices:
+			surfaces=BuildMergedGroup(surfaces, partial, cell_name, vertex_data, triangulation_data, materials, cell_collection, options)
+
+		BuildRenderSurfaces(surfaces, vertex_data, triangulation_data, materials, cell_collection, options)
+
+	BuildRenderSurfaces(unplaced, vertex_data, triangulation_data, materials, collection, options)
+
+# the group's surfaces as one mesh, except shadow volumes which are handed back to be built on their own
+# partial is set when the filter left some of the group's surfaces out
+def BuildMergedGroup(surfaces, partial, name, vertex_data, triangulation_data, materials, collection, options):
+	key="cell:{}".format(name)
+
+	merged=[i for i in surfaces if not IsShadowVolume(i, materials)]
+
+	# merging again without the skipped surfaces would lose them, an earlier merged group is kept as it was
+	if partial and options.ReimportIndex.keep(key):
+		merged=[]
+
+	if len(merged)>0:
+		# a merged group is rebuilt as a whole when any of its surfaces changed
+		source_hash=SourceHash(*[i.source_hash for i in merged])
+
+		if options.ReimportIndex.reuse(key, source_hash, collection) is None:
+			mesh_obj=MergeRenderSurfaces(IterRenderSurfaces(merged, vertex_data, triangulation_data), materials, collection, name, options)
+			options.ReimportIndex.store(key, source_hash, mesh_obj)
+
+	return [i for i in surfaces if IsShadowVolume(i, materials)]
+
+# each surface as its own object, unchanged ones from an earlier import are kept without decoding them
+def BuildRenderSurfaces(surfaces, vertex_data, triangulation_data, materials, collection, options):
+	changed=[i for i in surfaces if options.ReimportIndex.reuse("surface:{}".format(i.index), i.source_hash, collection) is None]
+
+	for i in IterRenderSurfaces(changed, vertex_data, triangulation_data):
+		options.ReimportIndex.store("surface:{}".format(i.index), i.source_hash, TestRenderSurface(i, materials, collection))
+
+def IsShadowVolume(surface, materials):
+	return materials!=None and materials[surface.material_id].name=="shadowvolume"
+
+# how far apart the attributes that also have to match when welding can be
+_WeldNormalTolerance=0.01
+_WeldUvTolerance=1.0/4096.0
+
+# every surface as one mesh, with a material slot per distinct material
+def MergeRenderSurfaces(surfaces, materials, collection, name, options):
+	positions=[]
+	normals=[]
+	vertex_uvs=[]
+	uvs=[]
+	loop_vertices=[]
+	material_indices=[]
+	slots={}
+
+	vertex_offset=0
+
+	for surface in surfaces:
+		vertex_count=len(surface.vertices)
+
+		positions.append(np.array([tuple(vert.position) for vert in surface.vertices], dtype=np.float32).reshape(-1, 3))
+		surface_uvs=np.array([tuple(vert.tex_coords) for vert in surface.vertices], dtype=np.float32).reshape(-1, 2)
+
+		if options.WeldVertices:
+			if options.WeldNormals:
+				normals.append(np.array([tuple(vert.normal) for vert in surface.vertices], dtype=np.float32).reshape(-1, 3))
+
+			if options.WeldUvs:
+				vertex_uvs.append(surface_uvs)
+
+		# same winding as TestRenderSurface, and triangles pointing outside the surface are dropped
+		tris=np.array(surface.indices, dtype=np.int64).reshape(-1, 3)[:, ::-1]
+		tris=tris[np.all((tris>=0) & (tris<vertex_count), axis=1)]
+
+		loop_vertices.append(tris.ravel()+vertex_offset)
+		uvs.append(surface_uvs[tris.ravel()])
+
+		slot=slots.setdefault(surface.material_id, len(slots))
+		material_indices.append(np.full(len(tris), slot, dtype=np.int32))
+
+		vertex_offset+=vertex_count
+
+	positions=np.concatenate(positions)
+	loop_vertices=np.concatenate(loop_vertices)
+	uvs=np.concatenate(uvs)
+	material_indices=np.concatenate(material_indices)
+
+	if options.WeldVertices:
+		attributes=[]
+		if options.WeldNormals:
+			attributes.append((np.concatenate(normals), _WeldNormalTolerance))
+		if options.WeldUvs:
+			attributes.append((np.concatenate(vertex_uvs), _WeldUvTolerance))
+
+		positions, loop_vertices, removed=WeldVertices(positions, loop_vertices, options.WeldDistance, attributes)
+		options.WeldedVertexCount+=removed
+
+		# triangles collapsed by the weld
+		tris=loop_vertices.reshape(-1, 3)
+		keep=(tris[:, 0]!=tris[:, 1]) & (tris[:, 1]!=tris[:, 2]) & (tris[:, 0]!=tris[:, 2])
+
+		loop_vertices=tris[keep].ravel()
+		uvs=uvs.reshape(-1, 3, 2)[keep].reshape(-1, 2)
+		material_indices=material_indices[keep]
+
+	poly_count=len(loop_vertices)//3
+
+	mesh=BuildMesh(name, positions, loop_vertices, np.arange(0, poly_count*3, 3), np.full(poly_count, 3), uvs, material_indices)
+
+	if materials!=None: # FIXME: this is not how this should be tested
+		for material_id in slots: # insertion order is slot order
+			mesh.materials.append(materials[material_id].material)
+
+	mesh_obj=bpy.data.objects.new(name, mesh)
+	collection.objects.link(mesh_obj)
+
+	return mesh_obj
+
 def ReadRenderTree(file):
 	count=ReadRaw(file, "I")[0]
 
@@ -434,4 +955,6 @@ def TestRenderSurface(surface: RenderSurface, materials: List[Material], collect
 
 	if materials!=None: # FIXME: this is not how this should be tested
 		if (materials[surface.material_id].name=="shadowvolume"):
-			mesh_obj.hide_set(True) # just to clean up the view a bit
\ No newline at end of file
+			mesh_obj.hide_set(True) # just to clean up the view a bit
+
+	return mesh_obj
\ No newline at end of file
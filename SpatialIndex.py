@@ -0,0 +1,163 @@
+import numpy as np
+from mathutils import Vector
+from mathutils.bvhtree import BVHTree
+from mathutils.kdtree import KDTree
+
+### Spatial Index
+
+# 12 triangles of a box, over the corners from _BoxCorners
+_BoxFaces=[
+	(0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5),
+	(0, 4, 5), (0, 5, 1), (2, 3, 7), (2, 7, 6),
+	(0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3),
+]
+
+def _BoxCorners(box_min, box_max):
+	return [(x, y, z) for x in (box_min[0], box_max[0]) for y in (box_min[1], box_max[1]) for z in (box_min[2], box_max[2])]
+
+# triangles gathered while a world is imported, in the same space and winding as the built meshes
+class WorldGeometry(object):
+	def __init__(self):
+		self.positions=[]
+		self.triangles=[]
+		self.sources=[] # (source name, first triangle, triangle count)
+
+		self.vertex_count=0
+		self.triangle_count=0
+
+	def addTriangles(self, positions, triangles, source):
+		positions=np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+		triangles=np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+
+		if len(triangles)==0:
+			return
+
+		self.positions.append(positions)
+		self.triangles.append(triangles+self.vertex_count)
+		self.sources.append((source, self.triangle_count, len(triangles)))
+
+		self.vertex_count+=len(positions)
+		self.triangle_count+=len(triangles)
+
+	# polygons are fanned into triangles, all polygons with the same vertex count at once
+	def addPolygons(self, vertices, polygons, source):
+		by_size={}
+		for poly in polygons:
+			if len(poly)>=3 and max(poly)<len(vertices):
+				by_size.setdefault(len(poly), []).append(poly)
+
+		triangles=[]
+		for size, group in by_size.items():
+			ids=np.array(group, dtype=np.int64)[:, ::-1] # reversed like TestWorldModel
+
+			fans=[np.stack([ids[:, 0], ids[:, i], ids[:, i+1]], axis=1) for i in range(1, size-1)]
+			triangles.append(np.stack(fans, axis=1).reshape(-1, 3))
+
+		if len(triangles)>0:
+			self.addTriangles(np.array([tuple(vert) for vert in vertices], dtype=np.float32), np.concatenate(triangles), source)
+
+	def build(self):
+		if self.triangle_count==0:
+			return SpatialIndex(np.zeros((0, 3), dtype=np.float32), np.zeros((0, 3), dtype=np.int64), [])
+
+		return SpatialIndex(np.concatenate(self.positions), np.concatenate(self.triangles), self.sources)
+
+# ray casts, nearest points and box overlaps over a world's triangles, without going through any Blender meshes
+# results name the BSP or render surface the triangle came from
+class SpatialIndex(object):
+	def __init__(self, positions, triangles, sources):
+		self.positions=positions
+		self.triangles=triangles
+		self.sources=sources
+
+		self._source_starts=np.array([start for _, start, _ in sources], dtype=np.int64)
+		self._centroids=None
+
+		self.tree=BVHTree.FromPolygons(positions.tolist(), triangles.tolist(), all_triangles=True)
+
+	def source(self, triangle):
+		return self.sources[np.searchsorted(self._source_starts, triangle, side="right")-1][0]
+
+	def _result(self, hit):
+		location, normal, triangle, distance=hit
+
+		if location is None:
+			return None
+
+		return location, normal, self.source(triangle), distance
+
+	# (location, normal, source, distance) of the first hit, None if nothing was hit
+	def rayCast(self, origin, direction, distance=1.0e10):
+		return self._result(self.tree.ray_cast(Vector(origin), Vector(direction).normalized(), distance))
+
+	def rayCastMany(self, origins, directions, distance=1.0e10):
+		return [self.rayCast(origin, direction, distance) for origin, direction in zip(origins, directions)]
+
+	def lineOfSight(self, start, end):
+		direction=Vector(end)-Vector(start)
+		return direction.length==0.0 or self.tree.ray_cast(Vector(start), direction.normalized(), direction.length)[0] is None
+
+	# (location, normal, source, distance) of the closest point within distance, None if there isn't one
+	def nearest(self, point, distance=1.0e10):
+		return self._result(self.tree.find_nearest(Vector(point), distance))
+
+	# indices of every triangle touching the box
+	def boxOverlap(self, box_min, box_max):
+		box_min=np.asarray(box_min, dtype=np.float32)
+		box_max=np.asarray(box_max, dtype=np.float32)
+
+		if len(self.triangles)==0:
+			return np.zeros(0, dtype=np.int64)
+
+		# triangles crossing the box's faces
+		box_tree=BVHTree.FromPolygons(_BoxCorners(box_min, box_max), _BoxFaces, all_triangles=True)
+		crossing=np.array([i for i, _ in self.tree.overlap(box_tree)], dtype=np.int64)
+
+		# and ones entirely inside it, their centroids have to be within the box's bounding sphere
+		center=(box_min+box_max)*0.5
+		radius=float(np.linalg.norm(box_max-box_min)*0.5)
+
+		candidates=np.array([i for _, i, _ in self.centroids().find_range(Vector(center), radius)], dtype=np.int64)
+
+		if len(candidates)>0:
+			corners=self.positions[self.triangles[candidates]]
+			inside=np.all((corners>=box_min) & (corners<=box_max), axis=(1, 2))
+			candidates=candidates[inside]
+
+		return np.union1d(crossing, candidates)
+
+	def boxOverlapSources(self, box_min, box_max):
+		return sorted(set(self.source(i) for i in self.boxOverlap(box_min, box_max)))
+
+	# only built for the first box query
+	def centroids(self):
+		if self._centroids is None:
+			centroids=self.positions[self.triangles].mean(axis=1)
+
+			self._centroids=KDTree(len(centroids))
+			for i, co in enumerate(centroids.tolist()):
+				self._centroids.insert(co, i)
+			self._centroids.balance()
+
+		return self._centroids
+
+	def save(self, filepath):
+		np.savez_compressed(filepath, positions=self.positions, triangles=self.triangles,
+			source_names=np.array([name for name, _, _ in self.sources]), source_ranges=np.array([(start, count) for _, start, count in self.sources], dtype=np.int64).reshape(-1, 2))
+
+def LoadSpatialIndex(filepath):
+	with np.load(filepath) as data:
+		sources=[(str(name), int(start), int(count)) for name, (start, count) in zip(data["source_names"], data["source_ranges"])]
+		return SpatialIndex(data["positions"], data["triangles"], sources)
+
+# every index built this session, by world name, so scripts can query worlds imported earlier
+_Indices={}
+
+def RegisterSpatialIndex(name, index):
+	_Indices[name]=index
+
+def GetSpatialIndex(name):
+	return _Indices.get(name)
+
+def SpatialIndexNames():
+	return sorted(_Indices)
\ No newline at end of file
@@ -0,0 +1,214 @@
+import os
+import bpy
+import struct
+import hashlib
+from collections import OrderedDict
+
+### Texture Budget
+
+# custom properties on proxy images, so they can be pointed back at the full resolution file and back again
+_SourceProperty="jupex_source"
+_ProxyProperty="jupex_proxy"
+
+# the source's path, size and modification time, so an edited texture gets a new proxy without reading the file to hash it
+def _ProxyKey(filepath, proxy_size):
+	stat=os.stat(filepath)
+	key="{}|{}|{}|{}".format(os.path.normcase(os.path.abspath(filepath)), stat.st_size, stat.st_mtime_ns, proxy_size)
+
+	return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+# width and height from the PNG header, so a proxy's pixels don't have to be loaded just to know what they'll take up
+def _PngSize(filepath):
+	with open(filepath, "rb") as f:
+		header=f.read(24)
+
+	if len(header)<24 or header[:8]!=b"\x89PNG\r\n\x1a\n":
+		return 0, 0
+
+	return struct.unpack(">2I", header[16:24])
+
+# textures are loaded as downscaled proxies cached on disk, only the proxies count towards the budget
+# loading an image doesn't read its pixels yet, Blender does that once something draws it, so the budget is only checked on a timer
+class TextureBudget(object):
+	def __init__(self, budget_bytes, proxy_size, cache_folder):
+		self.budget_bytes=budget_bytes
+		self.proxy_size=proxy_size
+		self.cache_folder=cache_folder
+
+		self.loaded=OrderedDict() # image name -> bytes the proxy takes once it's in memory, least recently used first
+		self.freed=set() # names of the images freed since they were last seen in memory
+
+		self.proxies_made=0
+		self.evicted=0
+
+	def load(self, filepath):
+		proxy_path=self.proxyPath(filepath)
+
+		image=bpy.data.images.load(filepath=proxy_path, check_existing=True)
+
+		if _SourceProperty not in image:
+			image.name=os.path.basename(filepath)
+			image[_SourceProperty]=filepath
+			image[_ProxyProperty]=proxy_path
+
+		self.touch(image.name, proxy_path)
+
+		return image
+
+	def proxyPath(self, filepath):
+		proxy_path=os.path.join(self.cache_folder, _ProxyKey(filepath, self.proxy_size)+".png")
+
+		if not os.path.exists(proxy_path):
+			self.makeProxy(filepath, proxy_path)
+
+		return proxy_path
+
+	def makeProxy(self, filepath, proxy_path):
+		image=bpy.data.images.load(filepath=filepath)
+
+		try:
+			width, height=image.size
+			scale=self.proxy_size/max(width, height, 1)
+
+			if scale<1.0:
+				image.scale(max(int(width*scale), 1), max(int(height*scale), 1))
+
+			# written under a temporary name first so an interrupted save never leaves a broken proxy behind
+			temp_path=proxy_path+".tmp.png"
+			image.filepath_raw=temp_path
+			image.file_format="PNG"
+			image.save()
+
+			os.replace(temp_path, proxy_path)
+		finally:
+			bpy.data.images.remove(image)
+
+		self.proxies_made+=1
+
+	def touch(self, name, proxy_path):
+		if name in self.loaded:
+			self.loaded.move_to_end(name)
+			return
+
+		width, height=_PngSize(proxy_path)
+		self.loaded[name]=width*height*4 # byte RGBA once it's in memory
+
+	# the managed proxies Blender has in memory right now, forgetting the ones that are gone
+	def resident(self):
+		for name in list(self.loaded):
+			image=bpy.data.images.get(name)
+
+			if image is None or _ProxyProperty not in image: # removed, or another file was opened
+				del self.loaded[name]
+				self.freed.discard(name)
+			elif image.has_data and name in self.freed: # back in memory after being freed, so something drew it since
+				self.freed.discard(name)
+				self.loaded.move_to_end(name)
+
+		images=[bpy.data.images.get(name) for name in self.loaded]
+
+		return [image for image in images if image.has_data]
+
+	@property
+	def used_bytes(self):
+		return sum(self.loaded[image.name] for image in self.resident())
+
+	# frees the least recently used proxies in memory until they fit the budget again, the newest one always stays
+	def enforce(self):
+		images=self.resident()
+		used=sum(self.loaded[image.name] for image in images)
+
+		for image in images[:-1]:
+			if used<=self.budget_bytes:
+				break
+
+			image.buffers_free()
+			used-=self.loaded[image.name]
+
+			self.freed.add(image.name)
+			self.evicted+=1
+
+# one budget for the whole session, every import adds to it and the timer keeps checking it
+_Budget=None
+_EnforceInterval=1.0
+
+_Rendering=False
+_FullResolution=set() # names of the proxies swapped for their full resolution file while rendering
+
+def Budget(budget_bytes, proxy_size, cache_folder):
+	global _Budget
+
+	if _Budget is None:
+		_Budget=TextureBudget(budget_bytes, proxy_size, cache_folder)
+	else:
+		_Budget.budget_bytes=budget_bytes
+		_Budget.proxy_size=proxy_size
+		_Budget.cache_folder=cache_folder
+
+		_Budget.proxies_made=0
+		_Budget.evicted=0
+
+	if not bpy.app.timers.is_registered(_Enforce):
+		bpy.app.timers.register(_Enforce, first_interval=_EnforceInterval, persistent=True)
+
+	return _Budget
+
+# stops once there's nothing left to manage, the next import starts it again
+def _Enforce():
+	if _Budget is None or len(_Budget.loaded)==0:
+		return None
+
+	# the full resolution textures a render is using aren't freed under it
+	if not _Rendering:
+		_Budget.enforce()
+
+	return _EnforceInterval
+
+def Stop():
+	if bpy.app.timers.is_registered(_Enforce):
+		bpy.app.timers.unregister(_Enforce)
+
+def _SetFile(image, filepath):
+	if image.filepath!=filepath:
+		image.filepath=filepath
+		image.reload()
+
+# the proxies the scene's renderable objects use through their materials
+def _RenderedImages(scene):
+	names=set()
+
+	for obj in scene.objects:
+		if obj.hide_render:
+			continue
+
+		for slot in obj.material_slots:
+			if slot.material is None or slot.material.node_tree is None:
+				continue
+
+			for node in slot.material.node_tree.nodes:
+				if node.type=="TEX_IMAGE" and node.image is not None and _SourceProperty in node.image:
+					names.add(node.image.name)
+
+	return names
+
+# renders load the full resolution textures of what they show, outside the budget, and the viewport goes back to the proxies afterwards
+def RenderStarted(scene):
+	global _Rendering
+	_Rendering=True
+
+	for name in _RenderedImages(scene):
+		image=bpy.data.images[name]
+		_SetFile(image, image[_SourceProperty])
+
+		_FullResolution.add(name)
+
+def RenderFinished():
+	global _Rendering
+	_Rendering=False
+
+	for name in _FullResolution:
+		image=bpy.data.images.get(name)
+		if image is not None:
+			_SetFile(image, image[_ProxyProperty])
+
+	_FullResolution.clear()
\ No newline at end of file
@@ -8,7 +8,8 @@ import struct
 
 from .utils import ReadRaw, ReadVector, ReadLTString, ReadCString
 
-from .WorldModels import TestWorldModel, readStringTable
+from .WorldModels import BuildWorldModel, IndexWorldModel, readStringTable
+from .Reimport import UniqueKeys
 
 ### Wld BSP section
 
@@ -124,6 +125,9 @@ class WldUnknownTable(object):
 
 class WldWorldModel(object):
 	def __init__(self):
+		self.offset=0 # where the world model starts in the file
+		self.size=0
+
 		self.vertex_count=0
 		self.polygon_count=0
 		self.unknown_table_count=0
@@ -168,21 +172,54 @@ class WldWorldModel(object):
 			temp_vert=Vector((temp_vert[0], temp_vert[2], temp_vert[1]))
 			self.vertices.append(temp_vert)
 
-def ReadWldFile(file):
+	# bytes the world model takes up from its counts alone, the file is left where it was
+	def measure(self, file):
+		start=file.tell()
+
+		_, vertex_count, polygon_count, _, unknown_table_count=ReadRaw(file, "5I")
+
+		header_size=struct.calcsize("5I")+2*struct.calcsize("3f")
+		table_size=struct.calcsize("Ihh")
+
+		if g_LastVersion==_VersionConstants[0]:
+			header_size+=struct.calcsize("I")
+			table_size=struct.calcsize("Iii")
+
+		file.seek(start+header_size)
+		vertex_counts=ReadRaw(file, "{}B".format(polygon_count))
+
+		file.seek(start)
+
+		polygon_size=struct.calcsize("2b")+struct.calcsize("H")+struct.calcsize("If")
+
+		return header_size+polygon_count*(1+polygon_size)+sum(vertex_counts)*4+unknown_table_count*table_size+vertex_count*struct.calcsize("3f")
+
+def ReadWldFile(file, options):
 	header=WldHeader()
 	header.read(file)
 
 	model_section=WldModelsSection()
 	model_section.read(file)
 
-	bsps=[]
+	collection=options.ReimportIndex.collection("wld_bsps", "FEAR 2 BSPs", options.WorldCollection)
+	keys=UniqueKeys("bsp")
+	for i in IterWldWorldModels(file, model_section, False):
+		IndexWorldModel(options.WorldModelIndex, i, BuildWorldModel(file, i, collection, options.ReimportIndex, keys.key(i.names[0]), options.Geometry))
+
+	options.ReimportIndex.prune("bsp:")
+
+# world models follow the models section back to back, read them lazily so each can be dropped once built
+# without decode they're handed out unread like WorldModelSection.iterWorldModels does
+def IterWldWorldModels(file, model_section, decode=True):
 	for i in range(model_section.bsp_count):
 		temp_wm=WldWorldModel()
-		temp_wm.read(file)
 		temp_wm.names=model_section.strings[i]
-		bsps.append(temp_wm)
+		temp_wm.offset=file.tell()
+		temp_wm.size=temp_wm.measure(file)
+
+		if decode:
+			temp_wm.read(file)
+
+		yield temp_wm
 
-	collection=bpy.data.collections.new("FEAR 2 BSPs")
-	bpy.context.scene.collection.children.link(collection)
-	for i in bsps:
-		TestWorldModel(i, collection);
\ No newline at end of file
+		file.seek(temp_wm.offset+temp_wm.size)
\ No newline at end of file
@@ -0,0 +1,172 @@
+import os
+import json
+import fnmatch
+
+from .utils import ReadRaw, CreateWorkerPool
+from .WorldHeader import Header, GameCode, DetectFileType, SwizzleVector
+
+from . import RenderMeshes, WorldObjects, WorldModels, WldBsp
+
+### World Catalog
+
+_CatalogVersion=1
+_WorldExtensions=[".world00p", ".wld"]
+
+# a catalog entry from the headers and tables only, none of the geometry is read
+def ScanWorld(path, game_id):
+	entry={
+		"size": os.path.getsize(path),
+		"mtime": os.path.getmtime(path),
+		"game": game_id,
+		"version": 0,
+		"bounds": None,
+		"bsps": [],
+		"surface_count": 0,
+		"triangle_count": 0,
+		"vertex_count": 0,
+		"materials": [],
+		"objects": {},
+	}
+
+	with open(path, "rb") as file:
+		game=DetectFileType(file, game_id)
+		entry["game"]=game
+
+		if game in [GameCode.FEAR2.name, GameCode.Condemned.name]:
+			header=WldBsp.WldHeader()
+			header.read(file)
+
+			model_section=WldBsp.WldModelsSection()
+			model_section.read(file)
+
+			entry["version"]=header.version
+			entry["bsps"]=[names[0] for names in model_section.strings if len(names)>0]
+			return entry
+
+		header=Header()
+		header.read(file)
+
+		entry["version"]=header.version
+		entry["bounds"]=[SwizzleVector(header.bounds_min), SwizzleVector(header.bounds_max)]
+
+		# the world model counts are xor'd with a per game number, a wrong guess only loses the names
+		try:
+			file.seek(56)
+			wm_section=WorldModels.WorldModelSection()
+			wm_section.readIndex(file, GameCode[game].value)
+			entry["bsps"]=[names[0] for names in wm_section.world_model_names if len(names)>0]
+		except Exception:
+			pass
+
+		file.seek(header.render_section)
+		_=ReadRaw(file, "10I")
+		render_surfaces, material_names=RenderMeshes.ReadRenderHeaders(file)
+
+		entry["surface_count"]=len(render_surfaces)
+		entry["triangle_count"]=sum(surface.indices_count for surface in render_surfaces)
+		entry["vertex_count"]=sum(surface.vertices_count for surface in render_surfaces)
+
+		used_materials=sorted(set(surface.material_id for surface in render_surfaces))
+		entry["materials"]=[material_names[i] for i in used_materials if i<len(material_names) and material_names[i]]
+
+		file.seek(header.object_section)
+		index=WorldObjects.ObjectIndex()
+		index.read(file)
+		entry["objects"]={type_name: len(entries) for type_name, entries in index.types.items()}
+
+	return entry
+
+class WorldCatalog(object):
+	def __init__(self):
+		self.game_data_folder=""
+		self.game_id=None
+		self.worlds={} # world path relative to the game folder -> entry
+		self.errors={}
+
+		self._materials=None # lower case material path -> [world path]
+
+	# the parsing is all Python, so worlds are scanned in worker processes rather than threads
+	def build(self, game_data_folder, game_id, worker_count=0):
+		self.game_data_folder=game_data_folder
+		self.game_id=game_id
+		self.errors={}
+		self._materials=None
+
+		paths=[]
+		for root, _, names in os.walk(game_data_folder):
+			for name in names:
+				if os.path.splitext(name)[1].lower() in _WorldExtensions:
+					paths.append(os.path.relpath(os.path.join(root, name), game_data_folder))
+
+		# worlds that haven't changed since the catalog was last built keep their entries
+		worlds={}
+		pending=[]
+		for path in sorted(paths):
+			full_path=os.path.join(game_data_folder, path)
+			old=self.worlds.get(path)
+
+			if old is not None and old["size"]==os.path.getsize(full_path) and old["mtime"]==os.path.getmtime(full_path):
+				worlds[path]=old
+			else:
+				pending.append(path)
+
+		if worker_count>1 and len(pending)>1:
+			with CreateWorkerPool(min(worker_count, len(pending)), blender_stand_ins=True) as executor:
+				scans={path: executor.submit(ScanWorld, os.path.join(game_data_folder, path), game_id) for path in pending}
+
+				for path, scan in scans.items():
+					try:
+						worlds[path]=scan.result()
+					except Exception as e:
+						self.errors[path]=repr(e)
+		else:
+			for path in pending:
+				try:
+					worlds[path]=ScanWorld(os.path.join(game_data_folder, path), game_id)
+				except Exception as e:
+					self.errors[path]=repr(e)
+
+		self.worlds=worlds
+
+		return len(pending)
+
+	def save(self, filepath):
+		with open(filepath, "w") as f:
+			json.dump({"version": _CatalogVersion, "game_data_folder": self.game_data_folder, "game_id": self.game_id, "worlds": self.worlds}, f)
+
+	def load(self, filepath):
+		with open(filepath, "r") as f:
+			data=json.load(f)
+
+		if data.get("version")!=_CatalogVersion:
+			raise ValueError("Unsupported catalog version {}, expected {}".format(data.get("version"), _CatalogVersion))
+
+		self.game_data_folder=data["game_data_folder"]
+		self.game_id=data["game_id"]
+		self.worlds=data["worlds"]
+		self._materials=None
+
+		return self
+
+	# patterns are case insensitive globs, e.g. *\concrete*.mat00
+	def worldsUsingMaterial(self, pattern):
+		if self._materials is None:
+			self._materials={}
+
+			for path, entry in self.worlds.items():
+				for mat_name in entry["materials"]:
+					self._materials.setdefault(mat_name.lower(), []).append(path)
+
+		pattern=pattern.lower()
+
+		if pattern in self._materials:
+			return list(self._materials[pattern])
+
+		return sorted(set(path for mat_name, paths in self._materials.items() if fnmatch.fnmatchcase(mat_name, pattern) for path in paths))
+
+	def worldsWithObjectType(self, type_name):
+		return [path for path, entry in self.worlds.items() if entry["objects"].get(type_name, 0)>0]
+
+	# key is any of the numeric entry fields, e.g. surface_count, triangle_count or vertex_count
+	def largestWorlds(self, key="surface_count", count=10):
+		return sorted(self.worlds, key=lambda path: self.worlds[path][key], reverse=True)[:count]
\ No newline at end of file
@@ -0,0 +1,62 @@
+from enum import Enum
+
+from .utils import ReadRaw, ReadVector
+
+# everything here is needed without Blender too, the catalog and the reader checks import it on its own
+
+class GameCode(Enum):
+	FEAR1=399
+	District187=246
+	FEAR2=None
+	Condemned=None
+	PetaCity=1120
+
+# detect file type
+def DetectFileType(file, game_code):
+	_=ReadRaw(file, "I")[0]
+	file.seek(0)
+	if _ & 0xFFFFFC00!=0:
+		return GameCode.FEAR2.name
+	else:
+		return game_code
+
+# world files are y up
+def SwizzleVector(vec):
+	return (vec[0], vec[2], vec[1])
+
+### Header Section
+
+_VersionConstant=113
+
+class Header(object):
+	def __init__(self):
+		self.version=0
+
+		# offsets
+		self.render_section=0
+		self.sector_section=0 # recorded but not decoded, the sector and portal layout isn't known yet
+		self.object_section=0
+		self.unk_section=0
+
+		self.bounds_min=(0.0, 0.0, 0.0)
+		self.bounds_max=(0.0, 0.0, 0.0)
+		self.world_offset=(0.0, 0.0, 0.0)
+
+	def __repr__(self):
+		return "Header: {} [{:#08x} {:#08x} {:#08x} {:#08x}] [{} {}] {}".format(self.version, self.render_section, self.sector_section, self.object_section,
+			self.unk_section, self.bounds_min, self.bounds_max, self.world_offset)
+
+	def __str__(self):
+		return repr(self)
+
+	def read(self, file):
+		self.version=ReadRaw(file, "I")[0]
+
+		if self.version!=_VersionConstant:
+			raise ValueError("Incorrect world version {}, expected {}".format(self.version, _VersionConstant))
+
+		self.render_section, self.sector_section, self.object_section, self.unk_section=ReadRaw(file, "4I")
+
+		self.bounds_min=ReadVector(file)
+		self.bounds_max=ReadVector(file)
+		self.world_offset=ReadVector(file)
\ No newline at end of file
@@ -7,9 +7,15 @@ from mathutils import Vector
 import struct
 
 from .utils import ReadRaw, ReadVector, ReadLTString, ReadCString
+from .Reimport import SourceHash, UniqueKeys
 
 ### BSP Section
 
+_WorldModelHeaderSize=struct.calcsize("5I")+2*struct.calcsize("3f")+struct.calcsize("I")
+_PolygonSize=struct.calcsize("2b")+struct.calcsize("H")+struct.calcsize("If") # without its vertex ids
+_NodeSize=struct.calcsize("I2i")
+_VertexSize=struct.calcsize("3f")
+
 class BspPolygon(object):
 	def __init__(self):
 		self.surface_flags=0
@@ -35,6 +41,8 @@ class BspPolygon(object):
 class WorldModel(object):
 	def __init__(self):
 		self.names=[]
+		self.offset=0 # where the world model starts in the file
+		self.size=0
 
 		self.polygons=[]
 		self.vertices=[]
@@ -66,6 +74,20 @@ class WorldModel(object):
 
 		# do polygon vertex fixup here?
 
+	# bytes the world model takes up from its counts alone, the file is left where it was
+	def measure(self, file):
+		start=file.tell()
+
+		_=ReadRaw(file, "I")
+		point_count, polygon_count, unk_count, node_count=ReadRaw(file, "4I")
+
+		file.seek(start+_WorldModelHeaderSize)
+		vertex_counts=file.read(polygon_count)
+
+		file.seek(start)
+
+		return _WorldModelHeaderSize+polygon_count*(1+_PolygonSize)+sum(vertex_counts)*4+node_count*_NodeSize+point_count*_VertexSize
+
 # returns array of strings correctly ordered for: bsp.name=str_table[bsp.id]
 def readStringTable(count, raws, indices):
 	strings_out=[]
@@ -80,10 +102,29 @@ def readStringTable(count, raws, indices):
 
 class WorldModelSection(object):
 	def __init__(self):
-		self.bounds_min=Vector()
-		self.bounds_max=Vector()
+		self.bounds_min=(0.0, 0.0, 0.0)
+		self.bounds_max=(0.0, 0.0, 0.0)
+
+		self.bsp_count=0
+		self.world_model_names=[]
+		self.planes=[]
+
+	def read(self, file, magic_number, options): # pull in the magic number
+		plane_count=self.readIndex(file, magic_number)[2]
+
+		self.planes=[]
+		for _ in range(plane_count):
+			self.planes.append(ReadVector(file))
+
+		collection=options.ReimportIndex.collection("world_models", "World Models", options.WorldCollection)
+		keys=UniqueKeys("bsp")
+		for i in self.iterWorldModels(file, False):
+			IndexWorldModel(options.WorldModelIndex, i, BuildWorldModel(file, i, collection, options.ReimportIndex, keys.key(i.names[0]), options.Geometry))
+
+		options.ReimportIndex.prune("bsp:")
 
-	def read(self, file, magic_number): # pull in the magic number
+	# just the counts and world model names, up to the planes
+	def readIndex(self, file, magic_number):
 		self.bounds_min=ReadVector(file)
 		self.bounds_max=ReadVector(file)
 
@@ -100,24 +141,50 @@ class WorldModelSection(object):
 		for _ in range(bsp_name_count):
 			bsp_name_indices.append(ReadRaw(file, "2I"))
 
-		world_model_names=readStringTable(bsp_count, bsp_names, bsp_name_indices)
+		self.bsp_count=bsp_count
+		self.world_model_names=readStringTable(bsp_count, bsp_names, bsp_name_indices)
 
-		planes=[]
-		for _ in range(plane_count):
-			planes.append(ReadVector(file))
+		return counts
 
-		world_models=[]
-		for i in range(bsp_count):
+	# world models are read and handed out one at a time, so only the one being built is held in memory
+	# without decode they're handed out unread and the caller reads the ones it needs, the next one is found either way
+	def iterWorldModels(self, file, decode=True):
+		for i in range(self.bsp_count):
 			world_model=WorldModel()
-			world_model.read(file)
-			world_model.names=world_model_names[i]
+			world_model.names=self.world_model_names[i]
+			world_model.offset=file.tell()
+			world_model.size=world_model.measure(file)
+
+			if decode:
+				world_model.read(file)
+
+			yield world_model
 
-			world_models.append(world_model)
+			file.seek(world_model.offset+world_model.size)
 
-		collection=bpy.data.collections.new("World Models")
-		bpy.context.scene.collection.children.link(collection)
-		for i in world_models:
-			TestWorldModel(i, collection)
+# every name a world model goes by -> its mesh object, so objects can find their geometry without going through bpy.data
+def IndexWorldModel(index, model, mesh_obj):
+	for name in model.names:
+		index.setdefault(name, mesh_obj)
+
+# the world model's object from an earlier import if its bytes haven't changed, otherwise it's decoded and built again
+# the bytes are hashed before decoding, an unchanged world model is only decoded when the spatial index needs its polygons
+def BuildWorldModel(file, model, collection, reimport, key, geometry):
+	file.seek(model.offset)
+	source_hash=SourceHash(file.read(model.size))
+	file.seek(model.offset)
+
+	mesh_obj=reimport.reuse(key, source_hash, collection)
+	if mesh_obj is None or geometry is not None:
+		model.read(file)
+
+	if mesh_obj is None:
+		mesh_obj=reimport.store(key, source_hash, TestWorldModel(model, collection))
+
+	if geometry is not None:
+		geometry.addPolygons(model.vertices, [poly.vertex_ids for poly in model.polygons], "bsp:{}".format(model.names[0]))
+
+	return mesh_obj
 
 def TestWorldModel(model, collection):
 	mesh=bpy.data.meshes.new("BSP")
@@ -148,4 +215,6 @@ def TestWorldModel(model, collection):
 	mesh.validate(clean_customdata=False)
 	mesh.update(calc_edges=False)
 
-	collection.objects.link(mesh_obj)
\ No newline at end of file
+	collection.objects.link(mesh_obj)
+
+	return mesh_obj
\ No newline at end of file
@@ -1,11 +1,14 @@
 import os
+import math
 import struct
 
 import bpy
+from mathutils import Quaternion
 
 from enum import IntEnum
 
 from .utils import ReadRaw, ReadLTString, ReadCString
+from .Reimport import SourceHash, UniqueKeys
 
 class ObjectPropertyType(IntEnum):
 	String=0
@@ -23,6 +26,8 @@ class Object(object):
 		self.type_name=None
 		self.properties={}
 
+		self.source_hash=None # of the object's bytes, set by ObjectIndex
+
 	def read(self, file):
 		self.type_name=ReadLTString(file)
 
@@ -49,55 +54,178 @@ class Object(object):
 			elif prop_type==ObjectPropertyType.Quaternion:
 				data=struct.unpack("I", data)[0]
 				data=struct.unpack("4f", props_buffer[data:data+16])
-				data=(data[3], data[0], data[2], data[1]) # reorder the quat for Blender
+				data=(data[3], -data[0], -data[2], -data[1]) # reorder the quat for Blender, swapping y and z mirrors the rotation so the axis flips too
 			else:
 				raise ValueError("Unknown object property type {}".format(prop_type))
 
 			self.properties[prop_name]=data
 
-def ReadObjects(file):
-	collection=bpy.data.collections.new("Lights")
-	bpy.context.scene.collection.children.link(collection)
+# object type -> Blender light type
+_LightTypes={
+	"LightCube": "POINT",
+	"LightDirectional": "SUN",
+	"LightPoint": "POINT",
+	"LightPointFill": "POINT",
+	"LightSpot": "SPOT",
+}
 
-	wm_collection=bpy.data.collections["World Models"]
+# Blender's spot and sun lights shine down their local -Z, LithTech's forward is +Z which becomes Blender's +Y
+_LightForward=(math.cos(math.pi/4), math.sin(math.pi/4), 0.0, 0.0)
 
-	# TODO: new name, and make instances of bsps for each empty instead of ignoring duplicates
-	empties_collection=bpy.data.collections.new("Test WMs")
-	bpy.context.scene.collection.children.link(empties_collection)
+# directional lights have no radius to go by, this is Blender's own default sun strength
+_SunStrength=1.0
+
+_WorldModelTypes=["WorldModel", "RotatingDoor", "RotatingSwitch", "RotatingWorldModel", "SlidingDoor", "SlidingSwitch", "SlidingWorldModel", "SpinningWorldModel"]
 
-	object_count=ReadRaw(file, "I")[0]
+class ObjectIndexEntry(object):
+	def __init__(self):
+		self.type_name=None
+		self.offset=0 # byte range of the whole object, including the type name
+		self.end=0
 
-	objects=[]
-	for i in range(object_count):
-		new_obj=Object()
-		new_obj.read(file)
-		objects.append(new_obj)
+		self.object=None # decoded Object, only filled in once asked for
 
-		if new_obj.type_name in ["LightCube", "LightDirectional", "LightPoint", "LightPointFill", "LightSpot"]:
-			print(new_obj.properties)
+	def __repr__(self):
+		return "Object Entry: {} [{:#08x} {:#08x}]".format(self.type_name, self.offset, self.end)
 
-			light=bpy.data.lights.new(new_obj.properties["Name"], "POINT")
-			light.energy=new_obj.properties["LightRadius"]
-			light.color=new_obj.properties["LightColor"]
-			light.distance=0.0
+	def __str__(self):
+		return repr(self)
+
+# records where each object is and what type it is, property blocks are only decoded for the types someone asks for
+class ObjectIndex(object):
+	def __init__(self):
+		self.file=None
+		self.entries=[]
+		self.types={} # type name -> [ObjectIndexEntry]
+
+		self._names=None
+
+	def read(self, file):
+		self.file=file
+
+		object_count=ReadRaw(file, "I")[0]
+
+		for i in range(object_count):
+			entry=ObjectIndexEntry()
+			entry.offset=file.tell()
+			entry.type_name=ReadLTString(file)
+
+			# props buffer followed by a (name index, type, data) entry per property
+			prop_count, props_size=ReadRaw(file, "2I")
+			file.seek(props_size+(prop_count*12), os.SEEK_CUR)
+
+			entry.end=file.tell()
+
+			self.entries.append(entry)
+			self.types.setdefault(entry.type_name, []).append(entry)
+
+	def decode(self, entry) -> Object:
+		if entry.object is None:
+			self.file.seek(entry.offset)
+
+			entry.object=Object()
+			entry.object.read(self.file)
+
+			self.file.seek(entry.offset)
+			entry.object.source_hash=SourceHash(self.file.read(entry.end-entry.offset))
+
+		return entry.object
+
+	def byType(self, *type_names):
+		return [self.decode(entry) for type_name in type_names for entry in self.types.get(type_name, [])]
+
+	# names are only known after decoding, so the first lookup decodes everything
+	def byName(self, name):
+		if self._names is None:
+			self._names={}
+
+			for entry in self.entries:
+				obj=self.decode(entry)
+				self._names.setdefault(obj.properties.get("Name"), obj)
 
-			light_obj=bpy.data.objects.new(new_obj.properties["Name"], light)
-			light_obj.location=new_obj.properties["Pos"]
-			light_obj.rotation_quaternion=new_obj.properties["Rotation"]
+		return self._names.get(name)
 
-			collection.objects.link(light_obj)
-		elif new_obj.type_name in ["WorldModel", "RotatingDoor", "RotatingSwitch", "RotatingWorldModel", "SlidingDoor", "SlidingSwitch", "SlidingWorldModel", "SpinningWorldModel"]:
-			#print(new_obj.properties["Name"])
+def ReadObjects(file, options):
+	reimport=options.ReimportIndex
 
+	collection=reimport.collection("lights", "Lights", options.WorldCollection)
+
+	# TODO: new name, and make instances of bsps for each empty instead of ignoring duplicates
+	empties_collection=reimport.collection("world_model_objects", "Test WMs", options.WorldCollection)
+
+	index=ObjectIndex()
+	index.read(file)
+
+	ImportLights(index.byType(*_LightTypes), collection, reimport)
+
+	keys=UniqueKeys("world_model")
+	for new_obj in index.byType(*_WorldModelTypes):
+		#print(new_obj.properties["Name"])
+
+		key=keys.key(new_obj.properties["Name"])
+
+		empty=reimport.reuse(key, new_obj.source_hash, empties_collection)
+		if empty is None:
 			empty=bpy.data.objects.new(new_obj.properties["Name"], None)
 			empty.location=new_obj.properties["Pos"]
 			empty.rotation_quaternion=new_obj.properties["Rotation"]
 
 			empties_collection.objects.link(empty)
+			empty=reimport.store(key, new_obj.source_hash, empty)
+
+		# covers every name the BSPs were given, missing ones just weren't imported
+		bsp_obj=options.WorldModelIndex.get(new_obj.properties["Name"])
+		if bsp_obj is not None:
+			bsp_obj.parent=empty
+
+	reimport.prune("light:")
+	reimport.prune("world_model:")
+
+# lights with the same settings share one light datablock, objects are all created first then linked in one go
+def ImportLights(lights, collection, reimport):
+	light_datas={}
+	light_objs=[]
+
+	keys=UniqueKeys("light")
+
+	for new_obj in lights:
+		props=new_obj.properties
+		light_type=_LightTypes[new_obj.type_name]
+
+		# unchanged since an earlier import
+		key=keys.key(props["Name"])
+		if reimport.reuse(key, new_obj.source_hash, collection) is not None:
+			continue
+
+		fov=props.get("FOV") if light_type=="SPOT" else None
+
+		# the radius only means something for point and spot lights
+		energy=_SunStrength if light_type=="SUN" else props["LightRadius"]
+
+		data_key=(light_type, energy, tuple(props["LightColor"]), fov)
+
+		light=light_datas.get(data_key)
+		if light is None:
+			light=bpy.data.lights.new(props["Name"], light_type)
+			light.energy=energy
+			light.color=props["LightColor"]
+			light.distance=0.0
+
+			if fov is not None:
+				light.spot_size=math.radians(fov)
+
+			light_datas[data_key]=light
+
+		light_obj=bpy.data.objects.new(props["Name"], light)
+		light_obj.location=props["Pos"]
+		light_obj.rotation_mode="QUATERNION"
+		light_obj.rotation_quaternion=Quaternion(props["Rotation"])
+
+		if light_type in ["SPOT", "SUN"]:
+			light_obj.rotation_quaternion=light_obj.rotation_quaternion@Quaternion(_LightForward)
+
+		light_objs.append((key, new_obj.source_hash, light_obj))
 
-			# FIXME: eventually I should do this properly, world models have all their possible names
-			try:
-				wm_collection.objects[new_obj.properties["Name"]].parent=empty
-			except KeyError as e:
-				print(repr(e))
-				pass
\ No newline at end of file
+	for key, source_hash, light_obj in light_objs:
+		collection.objects.link(light_obj)
+		reimport.store(key, source_hash, light_obj)
\ No newline at end of file
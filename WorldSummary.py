@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+
+from .utils import ReadRaw
+from .WorldHeader import Header, GameCode, DetectFileType
+
+from . import RenderMeshes, WorldModels, WorldObjects, WldBsp
+
+### World Summaries
+
+# a world is decoded without creating anything in Blender, and boiled down to counts and checksums of what the readers produced
+# comparing against a stored summary catches both decoding changes and parsing slowing down
+
+_TimingKeys=["seconds", "per_second"]
+
+def _Checksum(digest, values, dtype):
+	digest.update(np.ascontiguousarray(values, dtype=dtype).tobytes())
+
+def _SummarizeRenderSurfaces(file, header):
+	file.seek(header.render_section)
+	_=ReadRaw(file, "10I")
+
+	_, surface_count, material_count=ReadRaw(file, "3I")
+	block_sizes=ReadRaw(file, "2I")
+
+	vertex_data=memoryview(file.read(block_sizes[0]))
+	triangulation_data=memoryview(file.read(block_sizes[1]))
+
+	render_surfaces=RenderMeshes.ReadSurfaceHeaders(file)
+	material_names=RenderMeshes.ReadMaterialNames(file, material_count, [])
+
+	vertex_digest=hashlib.blake2b(digest_size=16)
+	index_digest=hashlib.blake2b(digest_size=16)
+	vertex_count=0
+	triangle_count=0
+
+	for surface in RenderMeshes.IterRenderSurfaces(render_surfaces, vertex_data, triangulation_data):
+		for vert in surface.vertices:
+			_Checksum(vertex_digest, tuple(vert.position)+tuple(vert.normal)+tuple(vert.tex_coords), np.float32)
+
+		_Checksum(index_digest, surface.indices, np.int32)
+
+		vertex_count+=len(surface.vertices)
+		triangle_count+=len(surface.indices)
+
+	return {
+		"count": len(render_surfaces),
+		"materials": len(material_names),
+		"vertices": vertex_count,
+		"triangles": triangle_count,
+		"vertex_checksum": vertex_digest.hexdigest(),
+		"index_checksum": index_digest.hexdigest(),
+	}, triangle_count
+
+def _SummarizeWorldModelList(world_models):
+	digest=hashlib.blake2b(digest_size=16)
+	count=0
+	vertex_count=0
+	polygon_count=0
+
+	for model in world_models:
+		_Checksum(digest, [tuple(vert) for vert in model.vertices], np.float32)
+
+		for poly in model.polygons:
+			_Checksum(digest, poly.vertex_ids, np.int32)
+
+		count+=1
+		vertex_count+=len(model.vertices)
+		polygon_count+=len(model.polygons)
+
+	return {
+		"count": count,
+		"vertices": vertex_count,
+		"polygons": polygon_count,
+		"checksum": digest.hexdigest(),
+	}, polygon_count
+
+def _SummarizeWorldModels(file, game_id):
+	file.seek(56)
+
+	wm_section=WorldModels.WorldModelSection()
+	plane_count=wm_section.readIndex(file, GameCode[game_id].value)[2]
+	file.seek(plane_count*12, os.SEEK_CUR)
+
+	return _SummarizeWorldModelList(wm_section.iterWorldModels(file))
+
+def _SummarizeObjects(file, header):
+	file.seek(header.object_section)
+
+	index=WorldObjects.ObjectIndex()
+	index.read(file)
+
+	digest=hashlib.blake2b(digest_size=16)
+	for entry in index.entries:
+		obj=index.decode(entry)
+		digest.update(repr((obj.type_name, sorted(obj.properties.items(), key=lambda i: i[0]))).encode())
+
+	return {
+		"count": len(index.entries),
+		"types": {type_name: len(entries) for type_name, entries in index.types.items()},
+		"checksum": digest.hexdigest(),
+	}, len(index.entries)
+
+# each section's summary, with how long it took and how many items per second that comes to
+def _Timed(summary, section, read):
+	start=time.perf_counter()
+	result, items=read()
+	seconds=time.perf_counter()-start
+
+	result["seconds"]=seconds
+	result["per_second"]=items/seconds if seconds>0.0 else 0.0
+
+	summary[section]=result
+
+def SummarizeWorld(filepath, game_id):
+	summary={}
+
+	with open(filepath, "rb") as file:
+		game_id=DetectFileType(file, game_id)
+
+		if game_id in [GameCode.FEAR2.name, GameCode.Condemned.name]:
+			def readWld():
+				header=WldBsp.WldHeader()
+				header.read(file)
+
+				model_section=WldBsp.WldModelsSection()
+				model_section.read(file)
+
+				return _SummarizeWorldModelList(WldBsp.IterWldWorldModels(file, model_section))
+
+			_Timed(summary, "world_models", readWld)
+			return summary
+
+		header=Header()
+		header.read(file)
+
+		_Timed(summary, "world_models", lambda: _SummarizeWorldModels(file, game_id))
+		_Timed(summary, "render_surfaces", lambda: _SummarizeRenderSurfaces(file, header))
+		_Timed(summary, "objects", lambda: _SummarizeObjects(file, header))
+
+	return summary
+
+# the counts and checksums only, they're the same on every machine
+def WithoutTimings(summary):
+	return {section: {key: value for key, value in result.items() if key not in _TimingKeys} for section, result in summary.items()}
+
+# differences between a stored summary and a new one, timings only count when they got slower than slowdown allows
+# summaries stored without timings only have their counts and checksums compared
+def CompareSummaries(golden, current, slowdown=0.25):
+	failures=[]
+
+	for section, expected in golden.items():
+		actual=current.get(section)
+
+		if actual is None:
+			failures.append("{}: missing".format(section))
+			continue
+
+		for key, value in expected.items():
+			if key in _TimingKeys:
+				continue
+
+			if actual.get(key)!=value:
+				failures.append("{}.{}: expected {}, got {}".format(section, key, value, actual.get(key)))
+
+		if expected.get("per_second", 0.0)>0.0 and actual["per_second"]<expected["per_second"]*(1.0-slowdown):
+			failures.append("{}: {:.0f} per second, down from {:.0f}".format(section, actual["per_second"], expected["per_second"]))
+
+	return failures
+
+# sections decoding fewer items per second than a fixed minimum, for thresholds that don't depend on an earlier run
+def CheckThroughput(current, thresholds):
+	failures=[]
+
+	for section, minimum in thresholds.items():
+		actual=current.get(section, {}).get("per_second", 0.0)
+
+		if actual<minimum:
+			failures.append("{}: {:.0f} per second, the minimum is {:.0f}".format(section, actual, minimum))
+
+	return failures
+
+# checks worlds against the summaries stored in golden_path, update stores the current results instead
+# returns world name -> failures for every world that didn't match
+def CheckWorlds(golden_path, world_paths, game_id, slowdown=0.25, update=False):
+	golden={}
+	if os.path.exists(golden_path):
+		with open(golden_path, "r") as f:
+			golden=json.load(f)
+
+	results={}
+	changed=False
+	for path in world_paths:
+		name=os.path.basename(path)
+		current=SummarizeWorld(path, game_id)
+
+		if update or name not in golden:
+			golden[name]=current
+			changed=True
+		else:
+			failures=CompareSummaries(golden[name], current, slowdown)
+			if len(failures)>0:
+				results[name]=failures
+
+	if changed:
+		with open(golden_path, "w") as f:
+			json.dump(golden, f, indent="\t", sort_keys=True)
+
+	return results
\ No newline at end of file
@@ -11,46 +11,107 @@ bl_info={
 }
 
 import os
+import sys
 import bpy
 import bpy_extras
-import bmesh
-from bpy.props import StringProperty, BoolProperty, FloatProperty, EnumProperty
+from bpy.props import StringProperty, BoolProperty, FloatProperty, EnumProperty, CollectionProperty, FloatVectorProperty, IntProperty
 from mathutils import Vector
 
-from enum import Enum
-
+import io
 import struct
+from concurrent.futures import ThreadPoolExecutor
 
 # Python's import system sucks so much!
 from .utils import ReadRaw, ReadVector, ReadLTString, ReadCString
+from .WorldHeader import GameCode, Header, DetectFileType, SwizzleVector
 
-# Jupiter EX
-from . import WorldModels
-from . import WorldObjects
-from . import RenderMeshes
+import importlib
 
-# Loki
-from . import WldBsp
+# the readers and writers are only imported once an import or export actually runs
+def LoadModules():
+	global WorldModels, WorldObjects, RenderMeshes, WldBsp, lta, WorldCatalog, Reimport, TextureBudget, SpatialIndex, MemoryProfile
 
-#Lithtech general
-from . import lithtech_ascii as lta
+	from . import Reimport
 
-import importlib
-importlib.reload(WorldModels)
-importlib.reload(WorldObjects)
-importlib.reload(RenderMeshes)
-importlib.reload(WldBsp)
+	# Jupiter EX
+	from . import WorldModels
+	from . import WorldObjects
+	from . import RenderMeshes
+
+	# Loki
+	from . import WldBsp
+
+	#Lithtech general
+	from . import lithtech_ascii as lta
+
+	from . import WorldCatalog
+	from . import MemoryProfile
+
+	# not reloaded with the rest, the indices already built live in it
+	from . import SpatialIndex
+
+	# not reloaded with the rest, the session's budget and the timer checking it live in it
+	from . import TextureBudget
+
+	if _DebugReloadEnabled():
+		from . import MeshBuilder, lta_format
+
+		# shared modules first so the ones importing from them pick up the reloaded versions
+		importlib.reload(MeshBuilder)
+		importlib.reload(lta_format)
+		importlib.reload(Reimport)
+		importlib.reload(WorldModels)
+		importlib.reload(WorldObjects)
+		importlib.reload(RenderMeshes)
+		importlib.reload(WldBsp)
+		importlib.reload(lta)
+		importlib.reload(WorldCatalog)
+		importlib.reload(MemoryProfile)
+
+def _ProxyCacheFolder():
+	addon=bpy.context.preferences.addons.get(__name__)
+	if addon is not None and addon.preferences.proxy_cache_folder:
+		folder=bpy.path.abspath(addon.preferences.proxy_cache_folder)
+		os.makedirs(folder, exist_ok=True)
+		return folder
+
+	return bpy.utils.user_resource("DATAFILES", path=os.path.join("io_scene_jupex", "texture_proxies"), create=True)
+
+def _DebugReloadEnabled():
+	addon=bpy.context.preferences.addons.get(__name__)
+	return addon is not None and addon.preferences.debug_reload
+
+class JupexPreferences(bpy.types.AddonPreferences):
+	bl_idname=__name__
+
+	debug_reload: BoolProperty(
+		name="Reload Modules",
+		description="Development only: reload the reader and writer modules every time an import or export runs",
+		default=False
+	)
+
+	proxy_cache_folder: StringProperty(
+		name="Texture Proxy Cache",
+		description="Where downscaled texture proxies are kept, empty uses Blender's user data folder",
+		default="",
+		subtype="DIR_PATH"
+	)
+
+	def draw(self, context):
+		self.layout.prop(self, "debug_reload")
+		self.layout.prop(self, "proxy_cache_folder")
 
 ###
 
 _GameDataFolder=r""
 
-class GameCode(Enum):
-	FEAR1=399
-	District187=246
-	FEAR2=None
-	Condemned=None
-	PetaCity=1120
+_GameItems=[
+	(GameCode.FEAR1.name, "FEAR", "FEAR, FEAR: Extraction Point, and FEAR: Perseus Mandate", 0),
+	(GameCode.District187.name, "District 187", "District 187, also known as S2 Son Silah", 1),
+	(GameCode.FEAR2.name, "FEAR 2", "FEAR 2: Project Origin", 2),
+	(GameCode.Condemned.name, "Condemned", "Condemned", 3),
+	(GameCode.PetaCity.name, "PetaCity", "PetaCity", 4),
+]
 
 class ImportOptions(object):
 	def __init__(self):
@@ -63,8 +124,97 @@ class ImportOptions(object):
 		self.ImportObjects=False
 		#self.ImportNavMesh=False
 
-def importWorld(options: ImportOptions):
-	return
+		self.Collection=None # parent collection the world's own collection is created in, defaults to the scene collection
+		self.WorldCollection=None # collection the world's collections are created in, set up by importWorld if not given
+		self.WorldSource=None # what the world's collection is tagged with to find it again on re-import, defaults to WorldName
+		self.MaterialCache=None # material path -> Material, shared between worlds when batch importing
+		self.WorldModelIndex={} # world model name -> BSP mesh object, filled in while reading the BSPs
+
+		self.GridCells=0 # cells along each axis render surfaces are split into, 0 keeps them all in one collection
+		self.GridMode="UNIFORM"
+		self.MergeCells=False
+
+		self.WeldVertices=False # merges duplicated vertices across the surfaces of each grid cell, or of the whole world without cells
+		self.WeldDistance=0.01
+		self.WeldNormals=False # only weld vertices with matching normals
+		self.WeldUvs=False # only weld vertices with matching texture coordinates
+		self.WeldedVertexCount=0
+		self.WorldBounds=None # (min, max) from the header, in Blender's axes
+
+		self.SurfaceFilter=None # RenderMeshes.SurfaceFilter, checked against each render surface's header before it's decoded
+
+		self.Reimport=False # update the datablocks an earlier import of this world left in WorldCollection instead of making new ones
+		self.ReimportIndex=None # Reimport.ReimportIndex, set up by importWorld
+
+		self.WorldName="World" # what the world's spatial index is registered as
+		self.BuildSpatialIndex=False
+		self.Geometry=None # SpatialIndex.WorldGeometry the decoded triangles are collected in while importing, set up by importWorld
+
+		self.TextureBudget=None # TextureBudget.TextureBudget to load downscaled proxies within a memory budget, None loads textures at full resolution
+
+		self.Profiler=None # MemoryProfile.MemoryProfiler that snapshots memory at each import stage, None doesn't profile
+
+def importWorld(file, options: ImportOptions):
+	if options.Collection is None:
+		options.Collection=bpy.context.scene.collection
+
+	if options.WorldCollection is None:
+		source=options.WorldSource if options.WorldSource is not None else options.WorldName
+		options.WorldCollection=Reimport.WorldCollection(options.Collection, source, options.WorldName, options.Reimport)
+
+	# everything gets tagged either way, only a re-import looks for what's already there, and only in this world's collection
+	options.ReimportIndex=Reimport.ReimportIndex(options.WorldCollection if options.Reimport else None)
+
+	if options.BuildSpatialIndex:
+		options.Geometry=SpatialIndex.WorldGeometry()
+
+	readWorld(file, options)
+
+	if options.Geometry is not None:
+		MemoryProfile.Mark(options.Profiler, "spatial index")
+		SpatialIndex.RegisterSpatialIndex(options.WorldName, options.Geometry.build())
+		options.Geometry=None
+
+	if options.Profiler is not None:
+		options.Profiler.finish()
+
+def readWorld(file, options: ImportOptions):
+	game_id=DetectFileType(file, options.GameId)
+
+	# FIXME: need a better solution for this
+	if game_id in [GameCode.FEAR2.name, GameCode.Condemned.name]:
+		MemoryProfile.Mark(options.Profiler, "world models")
+		WldBsp.ReadWldFile(file, options)
+		return
+
+	header=Header()
+	header.read(file)
+	print(header)
+
+	options.WorldBounds=(SwizzleVector(header.bounds_min), SwizzleVector(header.bounds_max))
+
+	if options.ImportBsps:
+		MemoryProfile.Mark(options.Profiler, "world models")
+		file.seek(56) # not needed
+		wm_section=WorldModels.WorldModelSection()
+		wm_section.read(file, GameCode[game_id].value, options)
+
+	if options.ImportRenderSurfaces:
+		file.seek(header.render_section)
+		render_section=ReadRaw(file, "10I")
+		RenderMeshes.ReadRenderMesh(file, render_section, options)
+
+	if options.ImportObjects:
+		MemoryProfile.Mark(options.Profiler, "objects")
+		file.seek(header.object_section)
+		WorldObjects.ReadObjects(file, options)
+
+def OffsetCollection(collection, offset):
+	offset=Vector(offset)
+
+	for obj in collection.all_objects:
+		if obj.parent is None:
+			obj.location=obj.location+offset
 
 ###
 
@@ -74,6 +224,8 @@ class WorldLoader(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
 
 	filename_ext=".world00p"
 
+	supports_reimport=True
+
 	filter_glob: StringProperty(
 		default="*.world00p;*.wld",
 		options={'HIDDEN'},
@@ -95,13 +247,7 @@ class WorldLoader(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
 	)
 
 	game_identity: EnumProperty(
-		items=[
-			(GameCode.FEAR1.name, "FEAR", "FEAR, FEAR: Extraction Point, and FEAR: Perseus Mandate", 0),
-			(GameCode.District187.name, "District 187", "District 187, also known as S2 Son Silah", 1),
-			(GameCode.FEAR2.name, "FEAR 2", "FEAR 2: Project Origin", 2),
-			(GameCode.Condemned.name, "Condemned", "Condemned", 3),
-			(GameCode.PetaCity.name, "PetaCity", "PetaCity", 4),
-		],
+		items=_GameItems,
 		name="Game",
 		description="Select the game the imported world is from",
 		default=0
@@ -131,6 +277,148 @@ class WorldLoader(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
 		default=False
 	)
 
+	grid_cells: IntProperty(
+		name="Grid Cells",
+		description="Split the render surfaces into this many cells along each axis, each cell gets its own collection. 0 turns this off",
+		default=0,
+		min=0,
+		max=64
+	)
+
+	grid_mode: EnumProperty(
+		items=[
+			("UNIFORM", "Uniform", "Evenly sized cells over the world's bounds"),
+			("ADAPTIVE", "Adaptive", "Cells sized so each one gets roughly as many surfaces"),
+		],
+		name="Grid",
+		default="UNIFORM"
+	)
+
+	merge_cells: BoolProperty(
+		name="Merge Cells",
+		description="Join each cell's render surfaces into a single object",
+		default=False
+	)
+
+	include_materials: StringProperty(
+		name="Include Materials",
+		description="Comma separated material patterns (e.g. *glass*, Materials\\World\\*), only matching render surfaces are imported. Empty imports all",
+		default=""
+	)
+
+	exclude_materials: StringProperty(
+		name="Exclude Materials",
+		description="Comma separated material patterns, matching render surfaces are skipped",
+		default=""
+	)
+
+	include_fx: StringProperty(
+		name="Include Shaders",
+		description="Comma separated shader (.fx) patterns, only render surfaces whose material uses a matching shader are imported. Empty imports all",
+		default=""
+	)
+
+	exclude_fx: StringProperty(
+		name="Exclude Shaders",
+		description="Comma separated shader (.fx) patterns, render surfaces whose material uses a matching shader are skipped",
+		default=""
+	)
+
+	exclude_vertex_definitions: StringProperty(
+		name="Exclude Vertex Formats",
+		description="Comma separated vertex definition indices, render surfaces using them are skipped",
+		default=""
+	)
+
+	min_triangles: IntProperty(
+		name="Min Triangles",
+		description="Skip render surfaces with fewer triangles than this",
+		default=0,
+		min=0
+	)
+
+	max_triangles: IntProperty(
+		name="Max Triangles",
+		description="Skip render surfaces with more triangles than this. 0 turns this off",
+		default=0,
+		min=0
+	)
+
+	weld_vertices: BoolProperty(
+		name="Weld Vertices",
+		description="Merge duplicated vertices within and across render surfaces. The render surfaces of each grid cell, or of the whole world without grid cells, become one mesh",
+		default=False
+	)
+
+	weld_distance: FloatProperty(
+		name="Distance",
+		description="Vertices this close together are welded",
+		default=0.01,
+		min=0.0001,
+		subtype="DISTANCE"
+	)
+
+	weld_normals: BoolProperty(
+		name="Match Normals",
+		description="Only weld vertices with the same normal",
+		default=False
+	)
+
+	weld_uvs: BoolProperty(
+		name="Match UVs",
+		description="Only weld vertices with the same texture coordinates",
+		default=False
+	)
+
+	use_texture_budget: BoolProperty(
+		name="Texture Budget",
+		description="Load downscaled copies of the textures, cached on disk, and free the least recently used ones past the budget. Renders use the full resolution textures of what they show, outside the budget",
+		default=False
+	)
+
+	texture_budget: IntProperty(
+		name="Budget (MB)",
+		description="Memory the viewport's texture proxies may take up, checked again every second",
+		default=1024,
+		min=16
+	)
+
+	proxy_size: EnumProperty(
+		items=[
+			("256", "256", ""),
+			("512", "512", ""),
+			("1024", "1024", ""),
+		],
+		name="Proxy Size",
+		description="Largest width or height of the downscaled textures",
+		default="512"
+	)
+
+	build_spatial_index: BoolProperty(
+		name="Spatial Index",
+		description="Keep the imported BSP and render surface triangles in an index scripts and the Query World operator can ray cast and search without going through the meshes",
+		default=False
+	)
+
+	profile_memory: BoolProperty(
+		name="Profile Memory",
+		description="Record peak and retained memory for each import stage, with the lines that allocated the most, slows the import down considerably",
+		default=False
+	)
+
+	memory_report: StringProperty(
+		name="Memory Report",
+		description="JSON file the memory profile is written to, empty writes it next to the world file",
+		default="",
+		subtype="FILE_PATH"
+	)
+
+	reimport: BoolProperty(
+		name="Re-import",
+		description="Update what an earlier import of this world created instead of importing it again, only parts that changed in the file are rebuilt",
+		default=False
+	)
+
 	import_nav_mesh: BoolProperty(
 		name="Import Nav Mesh",
 		description="",
@@ -150,10 +438,56 @@ class WorldLoader(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
 		box.row().prop(self, "import_bsps")
 		box.row().prop(self, "import_render_surfaces")
 		box.row().prop(self, "import_materials")
+		row=box.row()
+		row.enabled=self.import_materials
+		row.prop(self, "use_texture_budget")
+		for name in ["texture_budget", "proxy_size"]:
+			row=box.row()
+			row.enabled=self.import_materials and self.use_texture_budget
+			row.prop(self, name)
 		box.row().prop(self, "import_objects")
+		box.row().prop(self, "build_spatial_index")
+		if self.supports_reimport:
+			box.row().prop(self, "reimport")
 		#box.row().prop(self, "import_nav_mesh")
 
-	def execute(self, context):
+		box=layout.box()
+		box.label(text="Grid")
+		box.row().prop(self, "grid_cells")
+		row=box.row()
+		row.enabled=self.grid_cells>0
+		row.prop(self, "grid_mode")
+		row=box.row()
+		row.enabled=self.grid_cells>0
+		row.prop(self, "merge_cells")
+
+		box=layout.box()
+		box.label(text="Welding")
+		box.row().prop(self, "weld_vertices")
+		for name in ["weld_distance", "weld_normals", "weld_uvs"]:
+			row=box.row()
+			row.enabled=self.weld_vertices
+			row.prop(self, name)
+
+		box=layout.box()
+		box.label(text="Filter")
+		box.row().prop(self, "include_materials")
+		box.row().prop(self, "exclude_materials")
+		box.row().prop(self, "include_fx")
+		box.row().prop(self, "exclude_fx")
+		box.row().prop(self, "exclude_vertex_definitions")
+		box.row().prop(self, "min_triangles")
+		box.row().prop(self, "max_triangles")
+
+		box=layout.box()
+		box.label(text="Profiling")
+		box.row().prop(self, "profile_memory")
+		row=box.row()
+		row.enabled=self.profile_memory
+		row.prop(self, "memory_report")
+
+	# texture_budget is made once per run by the caller, every world of a batch shares it
+	def makeOptions(self, texture_budget):
 		opts=ImportOptions()
 		opts.GameDataFolder=os.fspath(self.game_data_folder)
 		opts.GameId=self.game_identity
@@ -161,35 +495,90 @@ class WorldLoader(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
 		opts.ImportRenderSurfaces=self.import_render_surfaces
 		opts.ImportMaterials=self.import_materials
 		opts.ImportObjects=self.import_objects
+		opts.Reimport=self.reimport
+		opts.BuildSpatialIndex=self.build_spatial_index
 		#opts.ImportNavMesh=self.import_nav_mesh
 
-		with open(self.filepath, "rb") as f:
+		opts.GridCells=self.grid_cells
+		opts.GridMode=self.grid_mode
+		opts.MergeCells=self.merge_cells
+
+		opts.WeldVertices=self.weld_vertices
+		opts.WeldDistance=self.weld_distance
+		opts.WeldNormals=self.weld_normals
+		opts.WeldUvs=self.weld_uvs
+
+		surface_filter=RenderMeshes.SurfaceFilter()
+		surface_filter.setPatterns(self.include_materials, self.exclude_materials, self.include_fx, self.exclude_fx)
+		surface_filter.exclude_vertex_definitions=[int(i) for i in self.exclude_vertex_definitions.split(",") if i.strip().isdigit()]
+		surface_filter.min_triangles=self.min_triangles
+		surface_filter.max_triangles=self.max_triangles
+
+		if not surface_filter.isEmpty():
+			opts.SurfaceFilter=surface_filter
+
+		opts.TextureBudget=texture_budget
+
+		return opts
 
-			# FIXME: need a better solution for this
-			if opts.GameId in [GameCode.FEAR2.name, GameCode.Condemned.name]:
-				WldBsp.ReadWldFile(f)
+	def makeTextureBudget(self):
+		if not (self.import_materials and self.use_texture_budget):
+			return None
 
-				SetCamera()
+		return TextureBudget.Budget(self.texture_budget*1024*1024, int(self.proxy_size), _ProxyCacheFolder())
 
-				return {"FINISHED"}
+	def reportTextures(self, texture_budget):
+		if texture_budget is not None:
+			self.report({"INFO"}, "Textures: {} proxies made, {} freed, {:.0f} MB of proxies in memory".format(texture_budget.proxies_made, texture_budget.evicted, texture_budget.used_bytes/(1024*1024)))
 
-			header=Header()
-			header.read(f)
-			print(header)
+	def makeProfiler(self):
+		if not self.profile_memory:
+			return None
 
-			if self.import_bsps:
-				f.seek(56) # not needed
-				wm_section=WorldModels.WorldModelSection()
-				wm_section.read(f, GameCode[opts.GameId].value)
+		profiler=MemoryProfile.MemoryProfiler()
+		profiler.start()
 
-			if self.import_render_surfaces:
-				f.seek(header.render_section)
-				render_section=ReadRaw(f, "10I")
-				RenderMeshes.ReadRenderMesh(f, render_section, opts)
+		return profiler
 
-			if self.import_objects:
-				f.seek(header.object_section)
-				WorldObjects.ReadObjects(f)
+	# the stages go in the report, the full profile with every stage's top allocation sites goes in the JSON file
+	def reportMemory(self, profiler, default_path):
+		if profiler is None:
+			return
+
+		profiler.stop()
+
+		for line in profiler.lines():
+			self.report({"INFO"}, line)
+
+		filepath=bpy.path.abspath(self.memory_report) if self.memory_report else default_path
+		try:
+			profiler.save(filepath)
+			self.report({"INFO"}, "Memory profile written to {}".format(filepath))
+		except OSError as e:
+			self.report({"WARNING"}, "Couldn't write the memory profile: {}".format(repr(e)))
+
+	def execute(self, context):
+		LoadModules()
+
+		opts=self.makeOptions(self.makeTextureBudget())
+		opts.WorldName=os.path.splitext(os.path.basename(self.filepath))[0]
+		opts.WorldSource=os.path.normcase(os.path.abspath(self.filepath))
+		opts.Profiler=self.makeProfiler()
+
+		try:
+			with open(self.filepath, "rb") as f:
+				importWorld(f, opts)
+		finally:
+			RenderMeshes.RemoveMaterialTemplates()
+			self.reportMemory(opts.Profiler, os.path.splitext(self.filepath)[0]+"_memory.json")
+
+		if opts.WeldVertices:
+			self.report({"INFO"}, "Welded {} vertices".format(opts.WeldedVertexCount))
+
+		self.reportTextures(opts.TextureBudget)
+
+		if opts.Reimport:
+			self.report({"INFO"}, "Re-imported: {} unchanged, {} rebuilt, {} removed".format(opts.ReimportIndex.reused, opts.ReimportIndex.rebuilt, opts.ReimportIndex.removed))
 
 		SetCamera()
 
@@ -199,6 +588,148 @@ class WorldLoader(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
 	def menu_func_import(self, context):
 		self.layout.operator(WorldLoader.bl_idname, text='Lithtech JupEx World (.world00p)')
 
+def _ReadWorldBytes(filepath):
+	with open(filepath, "rb") as f:
+		return f.read()
+
+class WorldBatchLoader(WorldLoader):
+	bl_idname="io_scene_jupex.world_batch_loader"
+	bl_label="Import Jupiter EX Worlds"
+
+	supports_reimport=False # every world gets a new collection, so there's nothing to match against
+
+	files: CollectionProperty(
+		type=bpy.types.OperatorFileListElement,
+		options={'HIDDEN', 'SKIP_SAVE'},
+	)
+
+	directory: StringProperty(
+		subtype="DIR_PATH",
+		options={'HIDDEN', 'SKIP_SAVE'},
+	)
+
+	import_folder: BoolProperty(
+		name="Whole Folder",
+		description="Import every world in the selected folder instead of only the selected files",
+		default=False
+	)
+
+	world_offset: FloatVectorProperty(
+		name="Offset",
+		description="Each world is moved by this much more than the previous one, zero keeps them all in place",
+		default=(0.0, 0.0, 0.0),
+		subtype="TRANSLATION"
+	)
+
+	def draw(self, context):
+		super().draw(context)
+
+		box=self.layout.box()
+		box.label(text="Batch Options")
+		box.row().prop(self, "import_folder")
+		box.row().prop(self, "world_offset")
+
+	def getFilePaths(self):
+		if self.import_folder:
+			names=[name for name in sorted(os.listdir(self.directory)) if os.path.splitext(name)[1].lower() in [".world00p", ".wld"]]
+		else:
+			names=[i.name for i in self.files if i.name]
+
+		return [os.path.join(self.directory, name) for name in names]
+
+	def execute(self, context):
+		LoadModules()
+
+		paths=self.getFilePaths()
+		if len(paths)==0:
+			self.report({"WARNING"}, "No worlds selected")
+			return {"CANCELLED"}
+
+		material_cache={}
+		texture_budget=self.makeTextureBudget() # one budget over every world
+		profiler=self.makeProfiler() # and one profile, with each stage named after its world
+		welded_count=0
+
+		try:
+			# the next file is read in the background while the current one is being built
+			with ThreadPoolExecutor(max_workers=1) as executor:
+				pending=executor.submit(_ReadWorldBytes, paths[0])
+
+				for i, path in enumerate(paths):
+					data=pending.result()
+					if i+1<len(paths):
+						pending=executor.submit(_ReadWorldBytes, paths[i+1])
+
+					collection=Reimport.WorldCollection(context.scene.collection, os.path.normcase(os.path.abspath(path)), os.path.splitext(os.path.basename(path))[0], False)
+
+					opts=self.makeOptions(texture_budget)
+					opts.Reimport=False
+					opts.WorldCollection=collection
+					opts.MaterialCache=material_cache
+					opts.WorldName=collection.name
+					opts.Profiler=profiler
+
+					if profiler is not None:
+						profiler.prefix="{}: ".format(collection.name)
+
+					try:
+						importWorld(io.BytesIO(data), opts)
+					except Exception as e:
+						self.report({"ERROR"}, "Failed to import {}: {}".format(path, repr(e)))
+						continue
+					finally:
+						data=None
+						welded_count+=opts.WeldedVertexCount
+
+					OffsetCollection(collection, Vector(self.world_offset)*i)
+		finally:
+			RenderMeshes.RemoveMaterialTemplates()
+
+		if self.weld_vertices:
+			self.report({"INFO"}, "Welded {} vertices".format(welded_count))
+
+		self.reportTextures(texture_budget)
+		self.reportMemory(profiler, os.path.join(self.directory, "batch_memory.json"))
+
+		SetCamera()
+
+		return {"FINISHED"}
+
+	@staticmethod
+	def menu_func_import(self, context):
+		self.layout.operator(WorldBatchLoader.bl_idname, text='Lithtech JupEx Worlds (batch)')
+
+class LtaWorldLoader(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
+	bl_idname="io_scene_jupex.lta_world_loader"
+	bl_label="Import Lithtech ASCII World"
+
+	filename_ext=".world00a"
+
+	filter_glob: StringProperty(
+		default="*.world00a;*.world00a.gz;*.world00a.xz;*.lta",
+		options={'HIDDEN'},
+		maxlen=255,
+	)
+
+	def execute(self, context):
+		LoadModules()
+
+		collection=bpy.data.collections.new(os.path.basename(self.filepath).split(".")[0])
+		context.scene.collection.children.link(collection)
+
+		with lta.OpenInput(self.filepath) as f:
+			brushes=lta.ReadLtaFile(f, collection)
+
+		self.report({"INFO"}, "Imported {} brushes".format(len(brushes)))
+
+		SetCamera()
+
+		return {"FINISHED"}
+
+	@staticmethod
+	def menu_func_import(self, context):
+		self.layout.operator(LtaWorldLoader.bl_idname, text='Lithtech ASCII World (.world00a)')
+
 class WorldExporter(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
 	bl_idname="io_scene_jupex.world_exporter"
 	bl_label="Export Jupiter EX World"
@@ -211,9 +742,36 @@ class WorldExporter(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
 		maxlen=255,
 	)
 
+	worker_count: IntProperty(
+		name="Worker Processes",
+		description="Format the brushes in this many background processes, 0 or 1 writes everything in Blender itself",
+		default=0,
+		min=0,
+		max=64
+	)
+
+	compression: EnumProperty(
+		items=[
+			("NONE", "None", "Plain text .world00a"),
+			("GZIP", "Gzip", "Gzip compressed .world00a.gz"),
+			("LZMA", "LZMA", "LZMA compressed .world00a.xz, smaller but slower"),
+		],
+		name="Compression",
+		description="Compress the file while it's being written",
+		default="NONE"
+	)
+
+	use_cache: BoolProperty(
+		name="Reuse Unchanged Brushes",
+		description="Brushes whose geometry and UVs haven't changed since the last export are copied from it instead of being written out again. Keeps the exported text in memory between exports, up to 256 MB",
+		default=False
+	)
+
 	def execute(self, context):
-		with open(self.filepath, "w") as f:
-			f.write(lta.write())
+		LoadModules()
+
+		with lta.OpenOutput(self.filepath, self.compression) as f:
+			lta.write(f, self.worker_count, self.use_cache)
 
 		print("world00a export called")
 		return {"FINISHED"}
@@ -222,28 +780,317 @@ class WorldExporter(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
 	def menu_func_export(self, context):
 		self.layout.operator(WorldExporter.bl_idname, text='Lithtech JupEx World (.world00a)')
 
+class WorldCatalogBuilder(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
+	bl_idname="io_scene_jupex.world_catalog_builder"
+	bl_label="Build Jupiter EX World Catalog"
+
+	filename_ext=".json"
+
+	filter_glob: StringProperty(
+		default="*.json",
+		options={'HIDDEN'},
+		maxlen=255,
+	)
+
+	game_data_folder: StringProperty(
+		name="Game Folder",
+		description="Every world in this folder and its subfolders is added to the catalog",
+		default=r"F:\FEAR Stuff\FEAR Public Tools v2\Dev\Runtime\Game",
+		maxlen=260,
+		subtype="DIR_PATH"
+	)
+
+	game_identity: EnumProperty(
+		items=_GameItems,
+		name="Game",
+		description="Select the game the worlds are from",
+		default=0
+	)
+
+	worker_count: IntProperty(
+		name="Worker Processes",
+		description="Scan this many worlds at the same time in background processes, 0 or 1 scans them in Blender itself",
+		default=4,
+		min=0,
+		max=64
+	)
+
+	def execute(self, context):
+		LoadModules()
+
+		catalog=WorldCatalog.WorldCatalog()
+
+		# an existing catalog is updated, only worlds that changed since are scanned again
+		if os.path.exists(self.filepath):
+			try:
+				catalog.load(self.filepath)
+			except (ValueError, KeyError):
+				pass
+
+		scanned=catalog.build(os.fspath(self.game_data_folder), self.game_identity, self.worker_count)
+		catalog.save(self.filepath)
+
+		for path, error in catalog.errors.items():
+			print(path, error)
+
+		self.report({"INFO"}, "Cataloged {} worlds, {} scanned, {} failed".format(len(catalog.worlds), scanned, len(catalog.errors)))
+
+		return {"FINISHED"}
+
+	@staticmethod
+	def menu_func_export(self, context):
+		self.layout.operator(WorldCatalogBuilder.bl_idname, text='Lithtech JupEx World Catalog (.json)')
+
+class WorldCatalogQuery(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
+	bl_idname="io_scene_jupex.world_catalog_query"
+	bl_label="Query Jupiter EX World Catalog"
+
+	filename_ext=".json"
+
+	filter_glob: StringProperty(
+		default="*.json",
+		options={'HIDDEN'},
+		maxlen=255,
+	)
+
+	query: EnumProperty(
+		items=[
+			("MATERIAL", "Material", "Worlds using a material"),
+			("OBJECT_TYPE", "Object Type", "Worlds containing an object type"),
+			("LARGEST", "Largest", "Largest worlds"),
+		],
+		name="Query",
+		default="MATERIAL"
+	)
+
+	pattern: StringProperty(
+		name="Pattern",
+		description="Material path pattern (e.g. *concrete*) or object type name (e.g. LightSpot)",
+		default=""
+	)
+
+	sort_key: EnumProperty(
+		items=[
+			("surface_count", "Surfaces", ""),
+			("triangle_count", "Triangles", ""),
+			("vertex_count", "Vertices", ""),
+		],
+		name="By",
+		default="surface_count"
+	)
+
+	count: IntProperty(
+		name="Count",
+		default=10,
+		min=1
+	)
+
+	def draw(self, context):
+		layout=self.layout
+
+		layout.row().prop(self, "query")
+
+		if self.query=="LARGEST":
+			layout.row().prop(self, "sort_key")
+			layout.row().prop(self, "count")
+		else:
+			layout.row().prop(self, "pattern")
+
+	def execute(self, context):
+		LoadModules()
+
+		catalog=WorldCatalog.WorldCatalog().load(self.filepath)
+
+		if self.query=="MATERIAL":
+			worlds=catalog.worldsUsingMaterial(self.pattern)
+		elif self.query=="OBJECT_TYPE":
+			worlds=catalog.worldsWithObjectType(self.pattern)
+		else:
+			worlds=["{} ({})".format(path, catalog.worlds[path][self.sort_key]) for path in catalog.largestWorlds(self.sort_key, self.count)]
+
+		for world in worlds:
+			print(world)
+
+		self.report({"INFO"}, "{} worlds: {}".format(len(worlds), ", ".join(worlds[:10])+(", ..." if len(worlds)>10 else "")))
+
+		return {"FINISHED"}
+
+	@staticmethod
+	def menu_func_import(self, context):
+		self.layout.operator(WorldCatalogQuery.bl_idname, text='Lithtech JupEx World Catalog Query (.json)')
+
+# enum items have to outlive the callback or Blender shows garbage
+_SpatialIndexItems=[]
+
+def _SpatialIndexEnumItems(self, context):
+	from . import SpatialIndex
+
+	_SpatialIndexItems[:]=[(name, name, "") for name in SpatialIndex.SpatialIndexNames()]
+	return _SpatialIndexItems
+
+class SpatialQuery(bpy.types.Operator):
+	bl_idname="io_scene_jupex.spatial_query"
+	bl_label="Query World"
+	bl_options={'REGISTER', 'UNDO'}
+
+	world: EnumProperty(
+		items=_SpatialIndexEnumItems,
+		name="World",
+		description="Worlds imported with Spatial Index on this session"
+	)
+
+	query: EnumProperty(
+		items=[
+			("RAY", "Ray Cast", "Cast a ray along the 3D cursor's -Z axis and move the cursor to the hit"),
+			("NEAREST", "Nearest", "Move the 3D cursor to the closest point on the world"),
+			("BOX", "Box", "List what overlaps a box around the 3D cursor"),
+		],
+		name="Query",
+		default="RAY"
+	)
+
+	distance: FloatProperty(
+		name="Distance",
+		description="How far the ray or the nearest point search reaches",
+		default=100000.0,
+		min=0.0,
+		subtype="DISTANCE"
+	)
+
+	box_size: FloatProperty(
+		name="Box Size",
+		default=256.0,
+		min=0.0,
+		subtype="DISTANCE"
+	)
+
+	def execute(self, context):
+		LoadModules()
+
+		index=SpatialIndex.GetSpatialIndex(self.world)
+		if index is None:
+			self.report({"WARNING"}, "No spatial index, import a world with Spatial Index on first")
+			return {"CANCELLED"}
+
+		cursor=context.scene.cursor
+
+		if self.query=="BOX":
+			half=Vector((self.box_size, self.box_size, self.box_size))*0.5
+			sources=index.boxOverlapSources(cursor.location-half, cursor.location+half)
+
+			for source in sources:
+				print(source)
+
+			self.report({"INFO"}, "{} overlapping: {}".format(len(sources), ", ".join(sources[:10])+(", ..." if len(sources)>10 else "")))
+			return {"FINISHED"}
+
+		if self.query=="RAY":
+			hit=index.rayCast(cursor.location, cursor.matrix.to_3x3()@Vector((0.0, 0.0, -1.0)), self.distance)
+		else:
+			hit=index.nearest(cursor.location, self.distance)
+
+		if hit is None:
+			self.report({"INFO"}, "Nothing found")
+			return {"FINISHED"}
+
+		location, normal, source, distance=hit
+		cursor.location=location
+
+		self.report({"INFO"}, "{} at {:.2f}".format(source, distance))
+
+		return {"FINISHED"}
+
+	@staticmethod
+	def menu_func_view(self, context):
+		self.layout.operator(SpatialQuery.bl_idname, text='Query Jupiter EX World')
+
+# datablocks the modules still hold on to belong to the file from before, only modules already loaded are touched
+@bpy.app.handlers.persistent
+def _ForgetDatablocks(*args):
+	render_meshes=sys.modules.get(__name__+".RenderMeshes")
+	if render_meshes is not None:
+		render_meshes.ForgetMaterialTemplates()
+
+# renders swap the texture proxies for their full resolution files, TextureBudget is only imported once a render starts
+@bpy.app.handlers.persistent
+def _RenderStarted(scene, *args):
+	from . import TextureBudget
+	TextureBudget.RenderStarted(scene)
+
+@bpy.app.handlers.persistent
+def _RenderFinished(*args):
+	texture_budget=sys.modules.get(__name__+".TextureBudget")
+	if texture_budget is not None:
+		texture_budget.RenderFinished()
+
+_Handlers=[
+	(bpy.app.handlers.load_post, _ForgetDatablocks),
+	(bpy.app.handlers.undo_post, _ForgetDatablocks),
+	(bpy.app.handlers.redo_post, _ForgetDatablocks),
+	(bpy.app.handlers.render_init, _RenderStarted),
+	(bpy.app.handlers.render_complete, _RenderFinished),
+	(bpy.app.handlers.render_cancel, _RenderFinished),
+]
+
 def register():
+	bpy.utils.register_class(JupexPreferences)
+
+	for handlers, handler in _Handlers:
+		if handler not in handlers:
+			handlers.append(handler)
+
 	bpy.utils.register_class(WorldLoader)
 	bpy.types.TOPBAR_MT_file_import.append(WorldLoader.menu_func_import)
 
+	bpy.utils.register_class(WorldBatchLoader)
+	bpy.types.TOPBAR_MT_file_import.append(WorldBatchLoader.menu_func_import)
+
+	bpy.utils.register_class(LtaWorldLoader)
+	bpy.types.TOPBAR_MT_file_import.append(LtaWorldLoader.menu_func_import)
+
 	bpy.utils.register_class(WorldExporter)
 	bpy.types.TOPBAR_MT_file_export.append(WorldExporter.menu_func_export)
 
+	bpy.utils.register_class(WorldCatalogBuilder)
+	bpy.types.TOPBAR_MT_file_export.append(WorldCatalogBuilder.menu_func_export)
+
+	bpy.utils.register_class(WorldCatalogQuery)
+	bpy.types.TOPBAR_MT_file_import.append(WorldCatalogQuery.menu_func_import)
+
+	bpy.utils.register_class(SpatialQuery)
+	bpy.types.VIEW3D_MT_view.append(SpatialQuery.menu_func_view)
+
 def unregister():
 	bpy.utils.unregister_class(WorldLoader)
 	bpy.types.TOPBAR_MT_file_import.remove(WorldLoader.menu_func_import)
 
+	bpy.utils.unregister_class(WorldBatchLoader)
+	bpy.types.TOPBAR_MT_file_import.remove(WorldBatchLoader.menu_func_import)
+
+	bpy.utils.unregister_class(LtaWorldLoader)
+	bpy.types.TOPBAR_MT_file_import.remove(LtaWorldLoader.menu_func_import)
+
 	bpy.utils.unregister_class(WorldExporter)
 	bpy.types.TOPBAR_MT_file_export.remove(WorldExporter.menu_func_export)
 
-# detect file type
-def DetectFileType(file, game_code):
-	_=ReadRaw(file, "I")[0]
-	file.seek(0)
-	if _ & 0xFFFFFC00!=0:
-		return GameCode.FEAR2.name
-	else:
-		return game_code
+	bpy.utils.unregister_class(WorldCatalogBuilder)
+	bpy.types.TOPBAR_MT_file_export.remove(WorldCatalogBuilder.menu_func_export)
+
+	bpy.utils.unregister_class(WorldCatalogQuery)
+	bpy.types.TOPBAR_MT_file_import.remove(WorldCatalogQuery.menu_func_import)
+
+	bpy.utils.unregister_class(SpatialQuery)
+	bpy.types.VIEW3D_MT_view.remove(SpatialQuery.menu_func_view)
+
+	for handlers, handler in _Handlers:
+		if handler in handlers:
+			handlers.remove(handler)
+
+	texture_budget=sys.modules.get(__name__+".TextureBudget")
+	if texture_budget is not None:
+		texture_budget.Stop()
+
+	bpy.utils.unregister_class(JupexPreferences)
 
 # camera util
 def SetCamera():
@@ -256,41 +1103,4 @@ def SetCamera():
 					space.shading.show_backface_culling=True
 
 					if space.clip_end<10000.0:
-						space.clip_end=100000.0
-
-### Header Section
-
-_VersionConstant=113
-
-class Header(object):
-	def __init__(self):
-		self.version=0
-
-		# offsets
-		self.render_section=0
-		self.sector_section=0
-		self.object_section=0
-		self.unk_section=0
-
-		self.bounds_min=Vector()
-		self.bounds_max=Vector()
-		self.world_offset=Vector()
-
-	def __repr__(self):
-		return "Header: {} [{:#08x} {:#08x} {:#08x} {:#08x}] [{} {}] {}".format(self.version, self.render_section, self.sector_section, self.object_section,
-			self.unk_section, self.bounds_min, self.bounds_max, self.world_offset)
-
-	def __str__(self):
-		return repr(self)
-
-	def read(self, file):
-		self.version=ReadRaw(file, "I")[0]
-
-		if self.version!=_VersionConstant:
-			raise ValueError("Incorrect world version {}, expected {}".format(self.version, _VersionConstant))
-
-		self.render_section, self.sector_section, self.object_section, self.unk_section=ReadRaw(file, "4I")
-
-		self.bounds_min=ReadVector(file)
-		self.bounds_max=ReadVector(file)
-		self.world_offset=ReadVector(file)
\ No newline at end of file
+						space.clip_end=100000.0
\ No newline at end of file
@@ -43,11 +43,22 @@ world
 		)
 '''
 
+import io
+import os
+import re
 import bpy
-import struct
+import gzip
+import lzma
+import numpy as np
+from collections import deque, OrderedDict
+from concurrent.futures import Future
 from mathutils import Vector
 from enum import Enum
 
+from .utils import CreateWorkerPool
+from .MeshBuilder import BuildMesh
+from .lta_format import LtaWriter, floattohex, floatstohex, PointListEntry, PointListEntries, UvMatrix, CalculateOpqArray, MeshArrays, WritePolyhedron, FormatPolyhedron
+
 class WorldNodeType(Enum):
 	null="null"
 	brush="brush"
@@ -74,96 +85,18 @@ class Node(object):
 		return node
 
 	def serialize(self):
-		str_out=""
-
-		str_out+=self._writeDepth()
-		str_out+=f"( {self.name} "
+		buffer=io.StringIO()
+		self.write(LtaWriter(buffer, self._depth))
 
-		if self.attribute is not None:
-			str_out+=self._writeAttribute()
+		return buffer.getvalue()
 
-		if self.is_list:
-			str_out+="("
-		str_out+="\n"
+	def write(self, writer):
+		writer.begin(self.name, self.attribute, self.is_list)
 
 		for child in self.children:
-			str_out+=child.serialize()
-
-		str_out+=self._writeDepth()
-		if self.is_list:
-			str_out+=") "
-		str_out+=")\n"
-
-		return str_out
-
-	def _writeAttribute(self):
-		if type(self.attribute) is int:
-			return "%d" % self.attribute
-		elif type(self.attribute) is str:
-			return f'"{self.attribute}"'
-		elif type(self.attribute) is float:
-			return "%.6f" % self.attribute
-		elif type(self.attribute) is Vector:
-			return "%.6f %.6f %.6f" % (self.attribute.x, self.attribute.y, self.attribute.z)
-		elif type(self.attribute) is list:
-			return self._writeList(self.attribute)
-		elif type(self.attribute) is tuple:
-			return self._writeList(self.attribute)
-		elif type(self.attribute) is UvMatrix:
-			return self._writeMatrix(self.attribute)
-
-		return str(self.attribute)
-
-	def _writeVector(self, val):
-		return f"{val.x} {val.y} {val.z}"
-
-	def _writeList(self, val):
-		return " ".join([str(i) for i in val])
-
-	def _writeMatrix(self, val):
-		str_out="\n"
-
-		self._depth+=1
-
-		for row in val.matrix:
-			str_out+=self._writeDepth()
-			str_out+="( {} )\n".format(" ".join(floattohex(x) for x in row))
-
-		self._depth-=1
-
-		return str_out
-
-	def _writeDepth(self):
-		return "\t"*self._depth
-
-def floattohex(f):
-	return hex(struct.unpack('<I', struct.pack('<f', f))[0])
+			child.write(writer)
 
-class PointListEntry(object):
-	def __init__(self, pos):
-		self.position=pos
-		self.colour=(255, 255, 255, 255)
-
-	def __repr__(self): # FIXME: garbage
-		return "{} {}".format(" ".join(floattohex(x) for x in self.position), " ".join(str(x) for x in self.colour))
-
-	def __str__(self):
-		return repr(self)
-
-class UvMatrix(object):
-	def __init__(self, mat):
-		self.matrix=mat
-
-	def __repr__(self):
-		str_out=""
-
-		for row in self.matrix:
-			str_out+="( {} )\n".format(" ".join(floattohex(x) for x in row))
-
-		return str_out
-
-	def __str__(self):
-		return repr(self)
+		writer.end()
 
 def OpqArea(vec_1, vec_2, vec_3):
 	area_1=vec_2-vec_1
@@ -232,115 +165,201 @@ def CalculateOpq(vert_1, vert_2, vert_3, uv_1, uv_2, uv_3, tex_w, tex_h):
 
 	return UvMatrix((o, p, q))
 
-def write():
-	main_node=Node("world")
+# the polyhedron text from previous exports, keyed by object name, so brushes that haven't changed don't get formatted again
+# the text of big worlds runs into hundreds of megabytes, past the limit the least recently exported brushes are dropped
+_PolyhedronCacheLimit=256*1024*1024
 
-	header_node=main_node.createChild("header", None, True)
-	version_node=header_node.createChild("versioncode", 2)
+class PolyhedronCache(object):
+	def __init__(self, max_bytes=_PolyhedronCacheLimit):
+		self.entries=OrderedDict() # name -> (fingerprint, depth, (text, degenerate count)), least recently used first
+		self.max_bytes=max_bytes
+		self.size=0
 
-	polyhedron_list_node=main_node.createChild("polyhedronlist", None, True)
+	def get(self, name, fingerprint, depth):
+		entry=self.entries.get(name)
 
-	### for each object we're exporting create a geo list
-	objects=[obj for obj in bpy.context.scene.objects if obj.type=='MESH']
+		if entry is None or entry[0]!=fingerprint or entry[1]!=depth:
+			return None
+
+		self.entries.move_to_end(name)
+
+		return entry[2]
+
+	def store(self, name, fingerprint, depth, block):
+		self.remove(name)
+
+		# a single brush bigger than the whole cache isn't worth keeping
+		if len(block[0])>self.max_bytes:
+			return
 
-	for obj in objects:
+		self.entries[name]=(fingerprint, depth, block)
+		self.size+=len(block[0])
 
-		### brush geo
-		poly_node=polyhedron_list_node.createChild("polyhedron", None, True)
-		poly_node.createChild("color", (255, 255, 255))
+		while self.size>self.max_bytes:
+			self.remove(next(iter(self.entries)))
 
-		pointlist_node=poly_node.createChild("pointlist")
+	def remove(self, name):
+		entry=self.entries.pop(name, None)
 
-		for (i, vert) in enumerate(obj.data.vertices):
-			pointlist_node.createChild("", PointListEntry(vert.co))
+		if entry is not None:
+			self.size-=len(entry[2][0])
 
-		polylist_node=poly_node.createChild("polylist", None, True)
+	def prune(self, names):
+		for name in [name for name in self.entries if name not in names]:
+			self.remove(name)
 
-		for poly in obj.data.polygons:
-			editpoly_node=polylist_node.createChild("editpoly")
-			editpoly_node.createChild("f", [i for i in poly.vertices])
-			#editpoly_node.createChild("material", r"Prefabs\Systemic\Vehicles\c2_exterior02.Mat00")
-			#editpoly_node.createChild("occlusion", "")
+_PolyhedronCache=PolyhedronCache()
 
-			mappings_node=editpoly_node.createChild("mappings", None, True)
+# mesh data is always pulled out here, the text either comes from the cache, the worker processes, or is formatted here
+# blocks are written back in the original order
+def _WritePolyhedronBlocks(writer, objects, worker_count, cache):
+	depth=writer.depth()
+	executor=CreateWorkerPool(worker_count) if worker_count>1 else None
 
-			_TextureScale=1
-			try:
-				_UvLayer=obj.data.uv_layers[0]
-			except:
-				_UvLayer=None
+	pending=deque()
 
-			verts=[]
-			uvs=[]
+	def write_next():
+		name, fingerprint, block=pending.popleft()
 
-			for loop_idx in poly.loop_indices:
-				v1=obj.data.loops[loop_idx].vertex_index
+		if isinstance(block, Future):
+			block=block.result()
 
-				verts.append(obj.data.vertices[v1])
+		if cache is not None:
+			cache.store(name, fingerprint, depth, block)
 
-				if _UvLayer!=None:
-					temp_uv=_UvLayer.data[loop_idx].uv;
+		text, degenerate_count=block
+		writer.file.write(text)
+		_ReportDegenerate(name, degenerate_count)
+
+	try:
+		for obj in objects:
+			arrays=MeshArrays(obj.data)
+
+			fingerprint=None
+			block=None
+
+			if cache is not None:
+				fingerprint=arrays.fingerprint()
+				block=cache.get(obj.name_full, fingerprint, depth)
+
+			if block is None:
+				if executor is not None:
+					block=executor.submit(FormatPolyhedron, arrays, depth)
 				else:
-					temp_uv=Vector((0, 0))
+					block=FormatPolyhedron(arrays, depth)
+
+			pending.append((obj.name_full, fingerprint, block))
+
+			# only keep a couple of objects per worker in flight so the arrays and text don't pile up
+			if len(pending)>=max(worker_count, 1)*2:
+				write_next()
+
+		while len(pending)>0:
+			write_next()
+	finally:
+		if executor is not None:
+			executor.shutdown()
+
+	if cache is not None:
+		cache.prune(set(obj.name_full for obj in objects))
 
-				uvs.append(temp_uv)
+def _ReportDegenerate(name, degenerate_count):
+	if degenerate_count>0:
+		print("error creating opq values for", degenerate_count, "polygons of", name)
 
-			try:
-				opq=CalculateOpq(verts[0].co, verts[1].co, verts[2].co, uvs[0], uvs[1], uvs[2], _TextureScale, _TextureScale)
-			except Exception as e:
-				print("error", e, "creating opq values for", obj.name_full);
-				opq=UvMatrix((Vector((0, 0, 0)), Vector((0, 0, 0)), Vector((0, 0, 0))))
+# compression -> suffix added to the file name
+_CompressionSuffixes={
+	"NONE": "",
+	"GZIP": ".gz",
+	"LZMA": ".xz",
+}
 
-			uv_node=mappings_node.createChild("0")
-			texture_info_node=uv_node.createChild("textureinfo", opq)
+# the compressors take the text as the writer produces it, so the uncompressed document never exists anywhere
+def OpenOutput(filepath, compression="NONE"):
+	suffix=_CompressionSuffixes[compression]
+	if not filepath.lower().endswith(suffix):
+		filepath+=suffix
 
-			#uv_node=mappings_node.createChild("1")
-			#texture_info_node=uv_node.createChild("textureinfo", UvMatrix(((66.0, 50.0, 0.0), (0.0, 0.0, 0.0), (0.0, 0.0, 0.0))))
+	if compression=="GZIP":
+		return gzip.open(filepath, "wt", compresslevel=6)
+	elif compression=="LZMA":
+		return lzma.open(filepath, "wt", preset=6)
 
-			#uv_node=mappings_node.createChild("2")
-			#texture_info_node=uv_node.createChild("textureinfo", UvMatrix(((66.0, 50.0, 0.0), (0.0, 0.0, 0.0), (0.0, 0.0, 0.0))))
+	# the writer streams straight into the file, a bigger buffer keeps the number of actual writes down
+	return open(filepath, "w", buffering=1024*1024)
+
+def write(file, worker_count=0, use_cache=False):
+	writer=LtaWriter(file)
+
+	writer.begin("world")
+
+	writer.begin("header", None, True)
+	writer.node("versioncode", 2)
+	writer.end()
+
+	writer.begin("polyhedronlist", None, True)
+
+	### for each object we're exporting create a geo list
+	objects=[obj for obj in bpy.context.scene.objects if obj.type=='MESH']
 
-			#uv_node=mappings_node.createChild("3")
-			#texture_info_node=uv_node.createChild("textureinfo", UvMatrix(((66.0, 50.0, 0.0), (0.0, 0.0, 0.0), (0.0, 0.0, 0.0))))
+	if worker_count>1 or use_cache:
+		_WritePolyhedronBlocks(writer, objects, worker_count, _PolyhedronCache if use_cache else None)
+	else:
+		for obj in objects:
+			_ReportDegenerate(obj.name_full, WritePolyhedron(writer, MeshArrays(obj.data)))
+
+	writer.end() # polyhedronlist
 
 	###
 
-	nodelist_node=main_node.createChild("nodehierarchy")
+	writer.begin("nodehierarchy")
 	### world nodes
-	world_node=nodelist_node.createChild("worldnode")
-	world_node.createChild("type", WorldNodeType.null)
-	world_node.createChild("label", "Base_Node") # only for type null
-	world_node.createChild("nodeid", 69)
-	flags_node=world_node.createChild("flags") # ( worldroot [if has children?] expanded )
-	flags_node.createChild("", ["worldroot", "expanded"])
+	writer.begin("worldnode")
+	writer.node("type", WorldNodeType.null)
+	writer.node("label", "Base_Node") # only for type null
+	writer.node("nodeid", 69)
+	writer.begin("flags") # ( worldroot [if has children?] expanded )
+	writer.node("", ["worldroot", "expanded"])
+	writer.end()
 
-	proplist_node=world_node.createChild("properties")
-	proplist_node.createChild("propid", 0)
+	writer.begin("properties")
+	writer.node("propid", 0)
+	writer.end()
 
-	children_node=world_node.createChild("childlist", None, True)
+	writer.begin("childlist", None, True)
 
 	# TODO: convert Blender's tree hierarchy as much as possible
 	for i, obj in enumerate(objects):
 
-		child_node=children_node.createChild("worldnode")
-		child_node.createChild("type", WorldNodeType.brush)
-		child_node.createChild("brushindex", i) # only for type brush
-		child_node.createChild("nodeid", 70+i)
-		flags_node=child_node.createChild("flags") # ( worldroot [if has children?] expanded )
-		flags_node.createChild("", None)
+		writer.begin("worldnode")
+		writer.node("type", WorldNodeType.brush)
+		writer.node("brushindex", i) # only for type brush
+		writer.node("nodeid", 70+i)
+		writer.begin("flags") # ( worldroot [if has children?] expanded )
+		writer.node("", None)
+		writer.end()
+
+		writer.begin("properties")
+		writer.node("name", "Brush")
+		writer.node("propid", i+1)
+		writer.end()
 
-		proplist_node=child_node.createChild("properties")
-		proplist_node.createChild("name", "Brush")
-		proplist_node.createChild("propid", i+1)
+		writer.end() # worldnode
+
+	writer.end() # childlist
+	writer.end() # worldnode
+	writer.end() # nodehierarchy
 	###
 
-	global_proplist_node=main_node.createChild("globalproplist", None, True)
-	proplist_node=global_proplist_node.createChild("proplist", None, True)
+	writer.begin("globalproplist", None, True)
+	writer.node("proplist", None, True)
 	### node properties
 	for i, obj in enumerate(objects):
-		proplist_node=global_proplist_node.createChild("proplist", None, True)
-		prop_name_node=proplist_node.createChild("string", "Name")
-		prop_name_node.createChild("data", obj.name_full)
+		writer.begin("proplist", None, True)
+		writer.begin("string", "Name")
+		writer.node("data", obj.name_full)
+		writer.end()
+		writer.end()
 	'''
 	proplist (
 		( string "Name" (  ) ( data "name string") )
@@ -356,4 +375,259 @@ def write():
 	'''
 	###
 
-	return main_node.serialize()
\ No newline at end of file
+	writer.end() # globalproplist
+	writer.end() # world
+
+### Reading
+
+_TokenPattern=re.compile(r'\(|\)|"[^"]*"?|[^\s()"]+')
+
+# the file is read a chunk at a time and split into tokens, a token running off the end of a chunk is carried over to the next
+class LtaTokens(object):
+	def __init__(self, file, chunk_size=1024*1024):
+		self._tokens=self._tokenize(file, chunk_size)
+		self._peeked=None
+
+	@staticmethod
+	def _tokenize(file, chunk_size):
+		leftover=""
+
+		while True:
+			chunk=file.read(chunk_size)
+			eof=len(chunk)==0
+
+			buffer=leftover+chunk
+			leftover=""
+
+			for match in _TokenPattern.finditer(buffer):
+				if not eof and match.end()==len(buffer):
+					leftover=buffer[match.start():]
+					break
+
+				yield match.group()
+
+			if eof:
+				return
+
+	def next(self):
+		if self._peeked is not None:
+			token, self._peeked=self._peeked, None
+			return token
+
+		token=next(self._tokens, None)
+		if token is None:
+			raise ValueError("Unexpected end of LTA file")
+
+		return token
+
+	def peek(self):
+		if self._peeked is None:
+			self._peeked=self.next()
+
+		return self._peeked
+
+# reads everything up to the matching ")" into nested lists, the opening "(" has to be read already
+def _ReadGroup(tokens):
+	items=[]
+
+	while True:
+		token=tokens.next()
+
+		if token=="(":
+			items.append(_ReadGroup(tokens))
+		elif token==")":
+			return items
+		else:
+			items.append(token)
+
+# child nodes of a group, the extra "(" list nodes wrap their children in is looked through
+def _Children(group):
+	children=[]
+
+	for item in group[1:]:
+		if type(item) is not list:
+			continue
+
+		if len(item)==0 or type(item[0]) is list:
+			children.extend(i for i in item if type(i) is list)
+		else:
+			children.append(item)
+
+	return children
+
+def _FindChild(group, name):
+	if group is None:
+		return None
+
+	for child in _Children(group):
+		if len(child)>0 and child[0]==name:
+			return child
+
+	return None
+
+def _Unquote(token):
+	return token[1:-1] if token.startswith('"') else token
+
+# pointlist values are either written by floattohex or as plain decimals, the hex ones are decoded all at once
+def _DecodeFloats(tokens):
+	is_hex=[token.startswith("0x") for token in tokens]
+
+	values=np.array([int(token, 16) if hexed else 0 for token, hexed in zip(tokens, is_hex)], dtype=np.uint32).view(np.float32)
+
+	if not all(is_hex):
+		values=values.copy()
+		for i, hexed in enumerate(is_hex):
+			if not hexed:
+				values[i]=float(tokens[i])
+
+	return values
+
+def _ReadPolyhedron(group):
+	coords=[]
+	for point in _Children(_FindChild(group, "pointlist") or []):
+		coords.extend(point[0:3])
+
+	positions=_DecodeFloats(coords).reshape(-1, 3)
+
+	loop_vertices=[]
+	loop_totals=[]
+	opqs=[]
+
+	for editpoly in _Children(_FindChild(group, "polylist") or []):
+		if editpoly[0]!="editpoly":
+			continue
+
+		indices=[int(i) for i in _FindChild(editpoly, "f")[1:] if type(i) is str]
+
+		loop_vertices.extend(indices)
+		loop_totals.append(len(indices))
+
+		texture_info=_FindChild(_FindChild(_FindChild(editpoly, "mappings"), "0"), "textureinfo")
+
+		opq=["0x0"]*9
+		if texture_info is not None:
+			rows=[row for row in texture_info[1:] if type(row) is list]
+			if len(rows)==3:
+				opq=rows[0][0:3]+rows[1][0:3]+rows[2][0:3]
+
+		opqs.extend(opq)
+
+	loop_vertices=np.array(loop_vertices, dtype=np.int32)
+	loop_totals=np.array(loop_totals, dtype=np.int32)
+	loop_starts=(np.cumsum(loop_totals)-loop_totals).astype(np.int32)
+
+	# undo the exporter's mapping, u=(v-O).P and v=-(v-O).Q with the 1x1 texture size it assumes
+	opqs=_DecodeFloats(opqs).reshape(-1, 3, 3).astype(np.float64)
+	loop_opqs=np.repeat(opqs, loop_totals, axis=0)
+	offsets=positions[loop_vertices]-loop_opqs[:, 0]
+
+	uvs=np.stack((np.einsum("ij,ij->i", offsets, loop_opqs[:, 1]), -np.einsum("ij,ij->i", offsets, loop_opqs[:, 2])), axis=1)
+
+	return positions, loop_vertices, loop_starts, loop_totals, uvs
+
+# polyhedrons are handed to on_polyhedron one at a time as they're read, the list itself is never held
+def _ReadPolyhedronList(tokens, on_polyhedron):
+	wrapper_depth=0
+
+	while True:
+		token=tokens.next()
+
+		if token=="(":
+			if tokens.peek()=="polyhedron":
+				on_polyhedron(_ReadGroup(tokens))
+			else:
+				wrapper_depth+=1
+		elif token==")":
+			if wrapper_depth==0:
+				return
+
+			wrapper_depth-=1
+
+# brush index -> name, from the brush world nodes and the global prop lists they point at
+def _ReadBrushNames(hierarchy, global_props):
+	prop_lists=[i for i in _Children(global_props) if i[0]=="proplist"] if global_props is not None else []
+
+	names={}
+
+	def walk(node):
+		node_type=_FindChild(node, "type")
+		brush_index=_FindChild(node, "brushindex")
+		prop_id=_FindChild(_FindChild(node, "properties"), "propid")
+
+		if node_type is not None and node_type[1]=="brush" and brush_index is not None and prop_id is not None:
+			prop_id=int(prop_id[1])
+
+			if prop_id<len(prop_lists):
+				for prop in _Children(prop_lists[prop_id]):
+					if prop[0]=="string" and len(prop)>1 and _Unquote(prop[1])=="Name":
+						data=_FindChild(prop, "data")
+						if data is not None and len(data)>1:
+							names[int(brush_index[1])]=_Unquote(data[1])
+
+		for child in _Children(_FindChild(node, "childlist") or []):
+			if child[0]=="worldnode":
+				walk(child)
+
+	if hierarchy is not None:
+		for node in _Children(hierarchy):
+			if node[0]=="worldnode":
+				walk(node)
+
+	return names
+
+def ReadLtaFile(file, collection):
+	tokens=LtaTokens(file)
+
+	if tokens.next()!="(" or tokens.next()!="world":
+		raise ValueError("Not an LTA world file")
+
+	brush_objs=[]
+
+	def on_polyhedron(group):
+		positions, loop_vertices, loop_starts, loop_totals, uvs=_ReadPolyhedron(group)
+
+		mesh=BuildMesh("Brush", positions, loop_vertices, loop_starts, loop_totals, uvs)
+		mesh_obj=bpy.data.objects.new("Brush", mesh)
+		collection.objects.link(mesh_obj)
+
+		brush_objs.append(mesh_obj)
+
+	groups={}
+
+	while True:
+		token=tokens.next()
+
+		if token==")":
+			break
+		elif token!="(":
+			continue
+
+		name=tokens.peek()
+		if name=="polyhedronlist":
+			tokens.next()
+			_ReadPolyhedronList(tokens, on_polyhedron)
+		elif name in ["nodehierarchy", "globalproplist"]:
+			groups[name]=_ReadGroup(tokens)
+		else:
+			_ReadGroup(tokens)
+
+	for brush_index, name in _ReadBrushNames(groups.get("nodehierarchy"), groups.get("globalproplist")).items():
+		if brush_index<len(brush_objs):
+			brush_objs[brush_index].name=name
+
+	return brush_objs
+
+_GzipMagic=b"\x1f\x8b"
+_LzmaMagic=b"\xfd7zXZ\x00"
+
+# opens plain, gzip or LZMA compressed LTA files as text, whatever OpenOutput wrote
+def OpenInput(filepath):
+	with open(filepath, "rb") as f:
+		magic=f.read(6)
+
+	if magic.startswith(_GzipMagic):
+		return gzip.open(filepath, "rt")
+	elif magic.startswith(_LzmaMagic):
+		return lzma.open(filepath, "rt")
+
+	return open(filepath, "r", buffering=1024*1024)
\ No newline at end of file
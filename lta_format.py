@@ -0,0 +1,306 @@
+# the parts of the LTA writer that don't need Blender, export worker processes import this on its own
+
+import io
+import struct
+import hashlib
+import numpy as np
+
+try:
+	from mathutils import Vector
+except ImportError: # not there in the export worker processes, they never write Vectors anyway
+	Vector=None
+
+# writes nodes out as they're opened and closed, only the stack of open nodes is kept around
+class LtaWriter(object):
+	def __init__(self, file, depth=0):
+		self.file=file
+
+		self._depth=depth
+		self._open_lists=[]
+
+	def begin(self, name, attribute=None, is_list=False):
+		depth=self.depth()
+		str_out="\t"*depth+f"( {name} "
+
+		if attribute is not None:
+			str_out+=_writeAttribute(attribute, depth)
+
+		if is_list:
+			str_out+="("
+		str_out+="\n"
+
+		self.file.write(str_out)
+		self._open_lists.append(is_list)
+
+	def end(self):
+		is_list=self._open_lists.pop()
+
+		str_out="\t"*self.depth()
+		if is_list:
+			str_out+=") "
+		str_out+=")\n"
+
+		self.file.write(str_out)
+
+	def node(self, name, attribute=None, is_list=False):
+		self.begin(name, attribute, is_list)
+		self.end()
+
+	# lots of leaf nodes with already formatted attributes, written a chunk at a time instead of a call per node
+	def nodes(self, name, attributes, chunk_size=4096):
+		indent="\t"*self.depth()
+		head=indent+f"( {name} "
+		tail="\n"+indent+")\n"
+
+		chunk=[]
+		for attribute in attributes:
+			chunk.append(head+attribute+tail)
+
+			if len(chunk)>=chunk_size:
+				self.file.write("".join(chunk))
+				chunk=[]
+
+		self.file.write("".join(chunk))
+
+	def depth(self):
+		return self._depth+len(self._open_lists)
+
+def _writeAttribute(attribute, depth):
+	if type(attribute) is int:
+		return "%d" % attribute
+	elif type(attribute) is str:
+		return f'"{attribute}"'
+	elif type(attribute) is float:
+		return "%.6f" % attribute
+	elif type(attribute) is Vector:
+		return "%.6f %.6f %.6f" % (attribute.x, attribute.y, attribute.z)
+	elif type(attribute) is list:
+		return _writeList(attribute)
+	elif type(attribute) is tuple:
+		return _writeList(attribute)
+	elif isinstance(attribute, UvMatrix):
+		return _writeMatrix(attribute, depth)
+
+	return str(attribute)
+
+def _writeList(val):
+	return " ".join([str(i) for i in val])
+
+def _writeMatrix(val, depth):
+	str_out="\n"
+
+	for row in val.hexRows():
+		str_out+="\t"*(depth+1)
+		str_out+="( {} )\n".format(" ".join(row))
+
+	return str_out
+
+def floattohex(f):
+	return hex(struct.unpack('<I', struct.pack('<f', f))[0])
+
+# floattohex for a whole array, the floats are reinterpreted as uint32 in one go, returns a flat list of tokens
+def floatstohex(values):
+	return list(map(hex, np.asarray(values, dtype="<f4").view("<u4").ravel().tolist()))
+
+_PointColour=(255, 255, 255, 255)
+
+class PointListEntry(object):
+	def __init__(self, pos):
+		self.position=pos
+		self.colour=_PointColour
+
+	def __repr__(self): # FIXME: garbage
+		return "{} {}".format(" ".join(floatstohex(self.position)), " ".join(str(x) for x in self.colour))
+
+	def __str__(self):
+		return repr(self)
+
+# pointlist entries for a (n, 3) array of positions
+def PointListEntries(positions):
+	tokens=floatstohex(positions)
+	colour=" ".join(str(x) for x in _PointColour)
+
+	for i in range(0, len(tokens), 3):
+		yield "{} {} {} {}".format(tokens[i], tokens[i+1], tokens[i+2], colour)
+
+class UvMatrix(object):
+	def __init__(self, mat, hex_rows=None):
+		self.matrix=mat
+		self.hex_rows=hex_rows # rows already encoded by floatstohex, for matrices that came out of a bulk encode
+
+	def hexRows(self):
+		if self.hex_rows is None:
+			tokens=iter(floatstohex([x for row in self.matrix for x in row]))
+			self.hex_rows=[[next(tokens) for x in row] for row in self.matrix]
+
+		return self.hex_rows
+
+	def __repr__(self):
+		str_out=""
+
+		for row in self.hexRows():
+			str_out+="( {} )\n".format(" ".join(row))
+
+		return str_out
+
+	def __str__(self):
+		return repr(self)
+
+def _OpqArea(vec_1, vec_2, vec_3):
+	area_1=vec_2-vec_1
+	area_2=vec_3-vec_1
+
+	return area_1[..., 0]*area_2[..., 1]-area_2[..., 0]*area_1[..., 1]
+
+def _Normalized(vecs):
+	lengths=np.linalg.norm(vecs, axis=1, keepdims=True)
+	return np.divide(vecs, lengths, out=np.zeros_like(vecs), where=lengths>0.0)
+
+def _Dot(vecs_1, vecs_2):
+	return np.einsum("ij,ij->i", vecs_1, vecs_2)
+
+# CalculateOpq for a whole array of polygons at once, verts is (n, 3, 3) and uvs (n, 3, 2) holding each polygon's first three vertices
+# returns the o, p, q arrays and a mask of the polygons whose mapping couldn't be solved, those get all zero vectors
+# it works in doubles where mathutils rounds every step to floats, so the written values can differ from CalculateOpq's in the last bits
+def CalculateOpqArray(verts, uvs, tex_w, tex_h):
+	verts=np.asarray(verts, dtype=np.float64)
+	uvs=np.asarray(uvs, dtype=np.float64)*(1.0, -1.0)
+
+	uv_1, uv_2, uv_3=uvs[:, 0], uvs[:, 1], uvs[:, 2]
+
+	tri_area=_OpqArea(uv_1, uv_2, uv_3)
+	degenerate=np.abs(tri_area)<0.00000001
+
+	with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+		def bary_point(point):
+			u=(_OpqArea(uv_2, uv_3, point)/tri_area)[:, None]
+			v=(_OpqArea(uv_3, uv_1, point)/tri_area)[:, None]
+			w=1.0-u-v
+
+			return (u*verts[:, 0])+(v*verts[:, 1])+(w*verts[:, 2])
+
+		o=bary_point(np.array((0.0, 0.0)))
+		p=bary_point(np.array((1.0, 0.0)))-o
+		q=bary_point(np.array((0.0, 1.0)))-o
+
+		p_len=1.0/(np.linalg.norm(p, axis=1)*(1.0/tex_w))
+		q_len=1.0/(np.linalg.norm(q, axis=1)*(1.0/tex_h))
+
+		p=_Normalized(p)
+		q=_Normalized(q)
+
+		r=np.cross(q, p)
+		p_new=_Normalized(np.cross(r, q))
+		q_new=_Normalized(np.cross(p, r))
+
+		p_scale=1.0/_Dot(p, p_new)
+		q_scale=1.0/_Dot(q, q_new)
+
+		r=_Normalized(np.cross(q_new, p_new))
+
+		p_new=p_new*(p_len*p_scale)[:, None]
+		q_new=q_new*(q_len*q_scale)[:, None]
+
+		p=p_new+r
+		q=q_new-(_Dot(p_new, q_new)[:, None]*r)
+
+	# anything the per polygon version would have thrown on ends up non-finite here
+	degenerate|=~(np.isfinite(o).all(axis=1) & np.isfinite(p).all(axis=1) & np.isfinite(q).all(axis=1))
+
+	o[degenerate]=0.0
+	p[degenerate]=0.0
+	q[degenerate]=0.0
+
+	return o, p, q, degenerate
+
+# pulls everything the exporter needs out of a mesh with foreach_get instead of going through each vertex, loop and polygon
+class MeshArrays(object):
+	def __init__(self, mesh):
+		self.positions=np.empty(len(mesh.vertices)*3, dtype=np.float32)
+		mesh.vertices.foreach_get("co", self.positions)
+		self.positions=self.positions.reshape(-1, 3)
+
+		self.loop_vertices=np.empty(len(mesh.loops), dtype=np.int32)
+		mesh.loops.foreach_get("vertex_index", self.loop_vertices)
+
+		self.loop_starts=np.empty(len(mesh.polygons), dtype=np.int32)
+		mesh.polygons.foreach_get("loop_start", self.loop_starts)
+
+		self.loop_totals=np.empty(len(mesh.polygons), dtype=np.int32)
+		mesh.polygons.foreach_get("loop_total", self.loop_totals)
+
+		self.uvs=np.zeros(len(mesh.loops)*2, dtype=np.float32)
+		if len(mesh.uv_layers)>0:
+			mesh.uv_layers[0].data.foreach_get("uv", self.uvs)
+		self.uvs=self.uvs.reshape(-1, 2)
+
+	# loop indices of each polygon's first three loops, (n, 3)
+	def firstLoops(self):
+		return self.loop_starts[:, None]+np.arange(3, dtype=np.int32)
+
+	# hash of everything that ends up in the polyhedron's text
+	def fingerprint(self):
+		digest=hashlib.blake2b(digest_size=16)
+
+		for array in (self.positions, self.loop_vertices, self.loop_starts, self.loop_totals, self.uvs):
+			digest.update(np.ascontiguousarray(array).tobytes())
+
+		return digest.digest()
+
+# returns how many polygons had a texture mapping that couldn't be solved, those are written with zeroed mappings
+def WritePolyhedron(writer, arrays):
+	writer.begin("polyhedron", None, True)
+	writer.node("color", (255, 255, 255))
+
+	writer.begin("pointlist")
+	writer.nodes("", PointListEntries(arrays.positions))
+	writer.end()
+
+	_TextureScale=1
+
+	# solve the texture mapping for every polygon up front
+	first_loops=arrays.firstLoops()
+	first_verts=arrays.positions[arrays.loop_vertices[first_loops]]
+	first_uvs=arrays.uvs[first_loops]
+
+	opq_o, opq_p, opq_q, degenerate=CalculateOpqArray(first_verts, first_uvs, _TextureScale, _TextureScale)
+
+	opq_hex=floatstohex(np.stack((opq_o, opq_p, opq_q), axis=1))
+
+	writer.begin("polylist", None, True)
+
+	loop_vertices=arrays.loop_vertices.tolist()
+
+	for (i, (start, total)) in enumerate(zip(arrays.loop_starts.tolist(), arrays.loop_totals.tolist())):
+		writer.begin("editpoly")
+		writer.node("f", loop_vertices[start:start+total])
+		#writer.node("material", r"Prefabs\Systemic\Vehicles\c2_exterior02.Mat00")
+		#writer.node("occlusion", "")
+
+		writer.begin("mappings", None, True)
+
+		tokens=opq_hex[i*9:(i+1)*9]
+		opq=UvMatrix(None, (tokens[0:3], tokens[3:6], tokens[6:9]))
+
+		writer.begin("0")
+		writer.node("textureinfo", opq)
+		writer.end()
+
+		#writer.begin("1")
+		#writer.node("textureinfo", UvMatrix(((66.0, 50.0, 0.0), (0.0, 0.0, 0.0), (0.0, 0.0, 0.0))))
+		#writer.end()
+
+		writer.end() # mappings
+		writer.end() # editpoly
+
+	writer.end() # polylist
+	writer.end() # polyhedron
+
+	return np.count_nonzero(degenerate)
+
+# the same as WritePolyhedron but returns the text as well, this is what the worker processes run
+def FormatPolyhedron(arrays, depth):
+	buffer=io.StringIO()
+	degenerate_count=WritePolyhedron(LtaWriter(buffer, depth), arrays)
+
+	return buffer.getvalue(), degenerate_count
@@ -0,0 +1,348 @@
+import os
+import sys
+import math
+import types
+import struct
+
+# just enough of bpy, bpy_extras, bmesh and mathutils for the readers to import and run outside Blender
+# the data model only covers what the importers touch: objects, lights, collections and custom properties
+
+_PackageFolder=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PackageName="io_scene_jupex"
+
+### mathutils
+
+def _Float32(value):
+	return struct.unpack("f", struct.pack("f", value))[0]
+
+def _Axis(index):
+	return property(lambda self: self._values[index])
+
+# components are kept at single precision like Blender's own vectors
+class Vector(object):
+	def __init__(self, values=(0.0, 0.0, 0.0)):
+		self._values=[_Float32(float(i)) for i in values]
+
+	def __len__(self):
+		return len(self._values)
+
+	def __iter__(self):
+		return iter(self._values)
+
+	def __getitem__(self, index):
+		return self._values[index]
+
+	def __repr__(self):
+		return "Vector(({}))".format(", ".join("{:.4f}".format(i) for i in self._values))
+
+	def __eq__(self, other):
+		return list(self)==list(other)
+
+	x=_Axis(0)
+	y=_Axis(1)
+	z=_Axis(2)
+
+	def __add__(self, other):
+		return Vector([a+b for a, b in zip(self, other)])
+
+	def __sub__(self, other):
+		return Vector([a-b for a, b in zip(self, other)])
+
+	def __neg__(self):
+		return Vector([-a for a in self])
+
+	def __mul__(self, scalar):
+		return Vector([a*scalar for a in self])
+
+	__rmul__=__mul__
+
+	def __truediv__(self, scalar):
+		return Vector([a/scalar for a in self])
+
+	@property
+	def length(self):
+		return math.sqrt(self.dot(self))
+
+	def dot(self, other):
+		return sum(a*b for a, b in zip(self, other))
+
+	def cross(self, other):
+		return Vector((self.y*other.z-self.z*other.y, self.z*other.x-self.x*other.z, self.x*other.y-self.y*other.x))
+
+	def normalize(self):
+		length=self.length
+		if length>0.0:
+			self._values=[_Float32(a/length) for a in self._values]
+
+	def normalized(self):
+		vec=self.copy()
+		vec.normalize()
+		return vec
+
+	def copy(self):
+		return Vector(self._values)
+
+class Quaternion(object):
+	def __init__(self, values=(1.0, 0.0, 0.0, 0.0)):
+		self._values=tuple(float(i) for i in values)
+
+	def __iter__(self):
+		return iter(self._values)
+
+	def __getitem__(self, index):
+		return self._values[index]
+
+	def __matmul__(self, other):
+		w1, x1, y1, z1=self._values
+		w2, x2, y2, z2=other._values
+
+		return Quaternion((
+			w1*w2-x1*x2-y1*y2-z1*z2,
+			w1*x2+x1*w2+y1*z2-z1*y2,
+			w1*y2-x1*z2+y1*w2+z1*x2,
+			w1*z2+x1*y2-y1*x2+z1*w2,
+		))
+
+class Matrix(object):
+	def copy(self):
+		return Matrix()
+
+### bpy.data
+
+# what Blender accepts as an ID property, anything else raises TypeError there too
+def _CheckIdProperty(value):
+	if isinstance(value, (str, bytes, int, float)):
+		return
+
+	if isinstance(value, (list, tuple)) and len(value)>0 and all(isinstance(i, (int, float)) and not isinstance(i, bool) for i in value):
+		return
+
+	if isinstance(value, dict) and all(isinstance(i, str) for i in value):
+		for i in value.values():
+			_CheckIdProperty(i)
+		return
+
+	raise TypeError("ID property value {!r} of type {} isn't supported".format(value, type(value).__name__))
+
+class ID(object):
+	def __init__(self, name):
+		self.name=name
+		self.name_full=name
+		self.use_fake_user=False
+
+		self._properties={}
+		self._removed=False
+
+	def __getitem__(self, key):
+		return self._properties[key]
+
+	def __setitem__(self, key, value):
+		if not isinstance(key, str):
+			raise TypeError("ID property names have to be strings, not {}".format(type(key).__name__))
+
+		_CheckIdProperty(value)
+		self._properties[key]=value
+
+	def __contains__(self, key):
+		return key in self._properties
+
+	def get(self, key, default=None):
+		return self._properties.get(key, default)
+
+	@property
+	def users(self):
+		return 0
+
+class Light(ID):
+	def __init__(self, name, type):
+		super().__init__(name)
+		self.type=type
+
+		self.energy=10.0
+		self.color=(1.0, 1.0, 1.0)
+		self.distance=0.0
+		self.spot_size=math.radians(45.0)
+
+	@property
+	def users(self):
+		return sum(1 for obj in data.objects if obj.data is self)
+
+class Mesh(ID):
+	def __init__(self, name):
+		super().__init__(name)
+		self.materials=[]
+
+	@property
+	def users(self):
+		return sum(1 for obj in data.objects if obj.data is self)
+
+class Material(ID):
+	pass
+
+class Image(ID):
+	def __init__(self, name):
+		super().__init__(name)
+		self.has_data=False
+
+	def buffers_free(self):
+		self.has_data=False
+
+class Object(ID):
+	def __init__(self, name, object_data):
+		super().__init__(name)
+		self.data=object_data
+
+		self.location=(0.0, 0.0, 0.0)
+		self.rotation_mode="XYZ"
+		self.rotation_quaternion=(1.0, 0.0, 0.0, 0.0)
+		self.matrix_basis=Matrix()
+		self.parent=None
+
+	@property
+	def type(self):
+		if self.data is None:
+			return "EMPTY"
+		elif isinstance(self.data, Light):
+			return "LIGHT"
+
+		return "MESH"
+
+	@property
+	def users_collection(self):
+		return [collection for collection in data.collections if self in collection.objects._objects]
+
+class _CollectionObjects(object):
+	def __init__(self):
+		self._objects=[]
+
+	def link(self, obj):
+		if obj in self._objects:
+			raise RuntimeError("Object '{}' already in collection".format(obj.name))
+
+		self._objects.append(obj)
+
+	def unlink(self, obj):
+		self._objects.remove(obj)
+
+	def __iter__(self):
+		return iter(list(self._objects))
+
+	def __len__(self):
+		return len(self._objects)
+
+class _CollectionChildren(object):
+	def __init__(self):
+		self._children=[]
+
+	def link(self, collection):
+		self._children.append(collection)
+
+	def __iter__(self):
+		return iter(list(self._children))
+
+class Collection(ID):
+	def __init__(self, name):
+		super().__init__(name)
+
+		self.objects=_CollectionObjects()
+		self.children=_CollectionChildren()
+
+	@property
+	def all_objects(self):
+		objects=list(self.objects)
+
+		for child in self.children:
+			objects.extend(i for i in child.all_objects if i not in objects)
+
+		return objects
+
+class _IdCollection(object):
+	def __init__(self, create):
+		self._create=create
+		self._items=[]
+
+	def new(self, *args):
+		item=self._create(*args)
+		self._items.append(item)
+
+		return item
+
+	def remove(self, item):
+		self._items.remove(item)
+		item._removed=True
+
+		if isinstance(item, Object):
+			for collection in item.users_collection:
+				collection.objects.unlink(item)
+
+	def get(self, name, default=None):
+		return next((i for i in self._items if i.name==name), default)
+
+	def __iter__(self):
+		return iter(list(self._items))
+
+	def __len__(self):
+		return len(self._items)
+
+	def __contains__(self, item):
+		return item in self._items
+
+class _Data(object):
+	def __init__(self):
+		self.reset()
+
+	def reset(self):
+		self.objects=_IdCollection(Object)
+		self.lights=_IdCollection(Light)
+		self.meshes=_IdCollection(Mesh)
+		self.materials=_IdCollection(Material)
+		self.images=_IdCollection(Image)
+		self.collections=_IdCollection(Collection)
+
+data=_Data()
+
+###
+
+def _Module(name, **attributes):
+	module=types.ModuleType(name)
+	module.__dict__.update(attributes)
+
+	sys.modules[name]=module
+
+	return module
+
+def _Persistent(function):
+	return function
+
+class _Timers(object):
+	def __init__(self):
+		self.registered=[]
+
+	def register(self, function, first_interval=0.0, persistent=False):
+		self.registered.append(function)
+
+	def unregister(self, function):
+		self.registered.remove(function)
+
+	def is_registered(self, function):
+		return function in self.registered
+
+def Install():
+	if "bpy" not in sys.modules:
+		handlers=types.SimpleNamespace(persistent=_Persistent, load_post=[], undo_post=[], redo_post=[], render_init=[], render_complete=[], render_cancel=[])
+
+		bpy=_Module("bpy", data=data, app=types.SimpleNamespace(handlers=handlers, timers=_Timers()), path=types.SimpleNamespace(abspath=lambda path: path))
+		bpy.types=_Module("bpy.types")
+		bpy.props=_Module("bpy.props")
+
+		bpy_extras=_Module("bpy_extras")
+		bpy_extras.io_utils=_Module("bpy_extras.io_utils")
+
+		_Module("bmesh")
+		_Module("mathutils", Vector=Vector, Matrix=Matrix, Quaternion=Quaternion)
+
+	# a bare stand-in for the package like lithtech_ascii's worker bootstrap, so the readers import without __init__
+	# it's registered under the folder's name too, which is what pytest imports the package's __init__ as
+	if PackageName not in sys.modules:
+		package=_Module(PackageName, __path__=[_PackageFolder])
+		sys.modules.setdefault(os.path.basename(_PackageFolder), package)
\ No newline at end of file
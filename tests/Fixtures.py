@@ -0,0 +1,268 @@
+import os
+import struct
+import numpy as np
+
+# small synthetic worlds, built the same way every time from a seed so the golden summaries stay valid
+# they follow the layouts the readers expect, not every field a real world has
+
+def _LTString(text):
+	data=text.encode("ascii")
+	return struct.pack("H", len(data))+data
+
+def _Floats(values):
+	return np.asarray(values, dtype="<f4").tobytes()
+
+### Objects
+
+_String=0
+_Vector=1
+_Colour=2
+_Float=3
+_Int=4
+_Quaternion=6
+
+# properties are (name, type, value), vectors are given in the file's axes
+def _Object(type_name, properties):
+	buffer=bytearray()
+	entries=bytearray()
+
+	def store(data):
+		offset=len(buffer)
+		buffer.extend(data)
+		return offset
+
+	for name, prop_type, value in properties:
+		name_index=store(name.encode("ascii")+b"\x00")
+
+		if prop_type==_String:
+			data=struct.pack("I", store(value.encode("ascii")+b"\x00"))
+		elif prop_type in [_Vector, _Colour]:
+			data=struct.pack("I", store(_Floats(value)))
+		elif prop_type==_Quaternion:
+			data=struct.pack("I", store(_Floats(value)))
+		elif prop_type==_Float:
+			data=struct.pack("f", value)
+		else:
+			data=struct.pack("i", value)
+
+		entries.extend(struct.pack("2I", name_index, prop_type)+data)
+
+	return _LTString(type_name)+struct.pack("2I", len(properties), len(buffer))+bytes(buffer)+bytes(entries)
+
+# rotation is in the file's order, (x, y, z, w)
+def Light(type_name, name, pos, radius, colour, fov=None, rotation=(0.0, 0.0, 0.0, 1.0)):
+	properties=[
+		("Name", _String, name),
+		("Pos", _Vector, pos),
+		("Rotation", _Quaternion, rotation),
+		("LightRadius", _Float, radius),
+		("LightColor", _Colour, colour),
+	]
+
+	if fov is not None:
+		properties.append(("FOV", _Float, fov))
+
+	return _Object(type_name, properties)
+
+def WorldModelObject(type_name, name, pos):
+	return _Object(type_name, [("Name", _String, name), ("Pos", _Vector, pos), ("Rotation", _Quaternion, (0.0, 0.0, 0.0, 1.0))])
+
+def ObjectSection(objects):
+	return struct.pack("I", len(objects))+b"".join(objects)
+
+def _Objects(rng, count):
+	objects=[]
+
+	for i in range(count):
+		pos=rng.uniform(-500.0, 500.0, 3)
+		kind=i%4
+
+		if kind==0:
+			objects.append(Light("LightPoint", "Light{}".format(i), pos, float(rng.randint(64, 512)), rng.uniform(0.0, 1.0, 3)))
+		elif kind==1:
+			objects.append(Light("LightSpot", "Spot{}".format(i), pos, 256.0, (1.0, 1.0, 1.0), 45.0))
+		elif kind==2:
+			objects.append(WorldModelObject("WorldModel", "Model{}".format(i%16), pos))
+		else:
+			objects.append(_Object("Trigger", [("Name", _String, "Trigger{}".format(i)), ("Pos", _Vector, pos), ("Enabled", _Int, i%2)]))
+
+	return objects
+
+### World models
+
+# a box split into quads, each polygon as many vertices as the box face has
+def _BoxModel(rng):
+	center=rng.uniform(-1000.0, 1000.0, 3)
+	half=rng.uniform(8.0, 64.0, 3)
+
+	corners=np.array([[x, y, z] for x in (-1.0, 1.0) for y in (-1.0, 1.0) for z in (-1.0, 1.0)])*half+center
+	faces=[(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+
+	return corners, faces
+
+def _WorldModel(corners, faces):
+	data=struct.pack("I", 0)
+	data+=struct.pack("4I", len(corners), len(faces), 0, 1)
+	data+=_Floats((1.0, 1.0, 1.0))+_Floats((0.0, 0.0, 0.0))
+	data+=struct.pack("I", 0)
+	data+=bytes(len(face) for face in faces)
+
+	for i, face in enumerate(faces):
+		data+=struct.pack("2b", 0, 0)+struct.pack("H", 0)+struct.pack("If", i, 0.0)+struct.pack("{}I".format(len(face)), *face)
+
+	data+=struct.pack("I2i", 0, -1, -1)
+	data+=_Floats(corners)
+
+	return data
+
+def WorldModelSection(models, magic_number):
+	names=bytearray()
+	name_indices=bytearray()
+
+	for i, (name, _, _) in enumerate(models):
+		name_indices+=struct.pack("2I", len(names), i)
+		names+=name.encode("ascii")+b"\x00"
+
+	plane_count=2
+	counts=[len(models), len(names), plane_count, len(models), 0, 0, 0, 0]
+
+	data=_Floats((-1.0, -1.0, -1.0))+_Floats((1.0, 1.0, 1.0))
+	data+=struct.pack("2I", 8, 0)+bytes(1)
+	data+=struct.pack("8I", *[count ^ magic_number for count in counts])
+	data+=bytes(names)+bytes(name_indices)
+	data+=_Floats([(0.0, 0.0, 1.0)]*plane_count)
+	data+=b"".join(_WorldModel(corners, faces) for _, corners, faces in models)
+
+	return data
+
+### Render surfaces
+
+# position, normal and texture coordinates
+_VertexDefinition=struct.pack("I", 32)+struct.pack("2H4b", 0, 0, 2, 0, 0, 0)+struct.pack("2H4b", 0, 12, 2, 0, 3, 0)+struct.pack("2H4b", 0, 24, 1, 0, 5, 0)+struct.pack("2H4b", 255, 0, 17, 0, 0, 0)
+_VertexSize=32
+
+# strips of quads over a bumpy patch, each surface somewhere else in the world
+def _Surface(rng, columns):
+	origin=rng.uniform(-2000.0, 2000.0, 3)
+
+	grid=[(x, z) for z in range(2) for x in range(columns+1)]
+	positions=np.array([(x*16.0, rng.uniform(0.0, 4.0), z*16.0) for x, z in grid])+origin
+	normals=np.tile((0.0, 1.0, 0.0), (len(grid), 1))
+	uvs=np.array([(x/columns, float(z)) for x, z in grid])
+
+	vertices=np.concatenate([positions, normals, uvs], axis=1)
+
+	triangles=[]
+	for x in range(columns):
+		a, b, c, d=x, x+1, x+columns+1, x+columns+2
+		triangles+=[(a, c, b), (b, c, d)]
+
+	return vertices, triangles
+
+def RenderSection(surfaces, materials):
+	vertex_block=bytearray()
+	triangle_block=bytearray()
+	headers=bytearray()
+
+	vertex_start=0
+	for material_id, (vertices, triangles) in surfaces:
+		indices_start=len(triangle_block)//2
+
+		vertex_block+=_Floats(vertices)
+		triangle_block+=(np.asarray(triangles, dtype=np.int64)+vertex_start).astype("<u2").tobytes() # indices count from the surface's first vertex
+
+		headers+=struct.pack("9I", vertex_start, len(vertices), _VertexSize, indices_start, 0, len(triangles), material_id, 0, 0)
+
+		vertex_start+=len(vertices)
+
+	data=struct.pack("10I", *[0]*10)
+	data+=struct.pack("3I", 0, len(surfaces), len(materials))
+	data+=struct.pack("2I", len(vertex_block), len(triangle_block))
+	data+=bytes(vertex_block)+bytes(triangle_block)
+	data+=struct.pack("I", 1)+_VertexDefinition
+	data+=struct.pack("I", len(surfaces))+bytes(headers)
+	data+=b"".join(_LTString(name) for name in materials)
+
+	return data
+
+### Worlds
+
+_HeaderSize=56
+
+def World00p(seed, model_count, surface_count, object_count, magic_number=399):
+	rng=np.random.RandomState(seed)
+
+	models=[("Model{}".format(i),)+_BoxModel(rng) for i in range(model_count)]
+	materials=[r"Materials\Concrete{}.Mat00".format(i) for i in range(8)]+[r"Materials\ShadowVolume.Mat00"]
+	surfaces=[(i%len(materials), _Surface(rng, 4+(i%8))) for i in range(surface_count)]
+
+	world_models=WorldModelSection(models, magic_number)
+	render=RenderSection(surfaces, materials)
+	objects=ObjectSection(_Objects(rng, object_count))
+
+	render_offset=_HeaderSize+len(world_models)
+	object_offset=render_offset+len(render)
+
+	header=struct.pack("I4I", 113, render_offset, 0, object_offset, 0)
+	header+=_Floats((-3000.0, -3000.0, -3000.0))+_Floats((3000.0, 3000.0, 3000.0))+_Floats((0.0, 0.0, 0.0))
+
+	return header+world_models+render+objects
+
+def Wld(seed, model_count, version=126):
+	rng=np.random.RandomState(seed)
+
+	models=[("Model{}".format(i),)+_BoxModel(rng) for i in range(model_count)]
+
+	names=bytearray()
+	name_entries=bytearray()
+	for i, (name, _, _) in enumerate(models):
+		name_entries+=struct.pack("II", len(names), i)
+		names+=name.encode("ascii")+b"\x00"
+
+	data=b"WLDP"+struct.pack("I", version)+_Floats([(0.0, 0.0, 0.0)]*5)
+
+	data+=struct.pack("I", 8)+bytes(1)
+	if version==113:
+		data+=struct.pack("I", 0)
+	data+=struct.pack("II", len(models), len(names))
+	data+=struct.pack("II", 1, len(models))
+	data+=struct.pack("4I", 0, 0, 0, 0)
+	if version==126:
+		data+=struct.pack("I", 2)+_Floats((0.5, 0.25))
+	data+=bytes(names)+bytes(name_entries)
+	data+=_Floats((0.0, 1.0, 0.0))
+
+	for _, corners, faces in models:
+		data+=struct.pack("5I", 0, len(corners), len(faces), 0, 1)
+		data+=_Floats((0.0, 0.0, 0.0))+_Floats((1.0, 1.0, 1.0))
+		if version==113:
+			data+=struct.pack("I", 0)
+		data+=bytes(len(face) for face in faces)
+
+		for i, face in enumerate(faces):
+			data+=struct.pack("2b", 0, 0)+struct.pack("H", 0)+struct.pack("If", i, 0.0)+struct.pack("{}I".format(len(face)), *face)
+
+		data+=struct.pack("Ihh", 0, 0, 0) if version==126 else struct.pack("Iii", 0, 0, 0)
+		data+=_Floats(corners)
+
+	return data
+
+# file name -> (game, bytes), the fixed worlds the golden summaries and throughput thresholds are stored for
+Worlds={
+	"small.world00p": lambda: ("FEAR1", World00p(1, 8, 40, 64)),
+	"medium.world00p": lambda: ("FEAR1", World00p(2, 48, 400, 512)),
+	"district.world00p": lambda: ("District187", World00p(3, 16, 120, 128, magic_number=246)),
+	"models.wld": lambda: ("FEAR2", Wld(4, 64)),
+}
+
+def WriteWorlds(folder):
+	paths={}
+
+	for name, build in Worlds.items():
+		game_id, data=build()
+
+		paths[name]=(game_id, os.path.join(folder, name))
+		with open(paths[name][1], "wb") as f:
+			f.write(data)
+
+	return paths
\ No newline at end of file
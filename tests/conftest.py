@@ -0,0 +1,15 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import BlenderStubs
+
+# before anything is collected, pytest imports the package's __init__ and that needs Blender
+BlenderStubs.Install()
+
+def pytest_addoption(parser):
+	parser.addoption("--update-golden", action="store_true", default=False, help="Store the current reader output as the golden summaries instead of checking it")
+
+def pytest_runtest_setup(item):
+	BlenderStubs.data.reset()
\ No newline at end of file
@@ -0,0 +1,28 @@
+import Fixtures
+from io_scene_jupex import WorldCatalog
+
+# worker processes get none of the test's Blender stand-ins, so this also checks the scans never need Blender
+
+def _Build(folder, worker_count):
+	catalog=WorldCatalog.WorldCatalog()
+	scanned=catalog.build(folder, "FEAR1", worker_count)
+
+	return catalog, scanned
+
+def test_parallel_scan_matches_sequential(tmp_path):
+	folder=str(tmp_path)
+	for name in ["small.world00p", "medium.world00p"]:
+		with open(tmp_path/name, "wb") as f:
+			f.write(Fixtures.Worlds[name]()[1])
+
+	with open(tmp_path/"broken.world00p", "wb") as f:
+		f.write(b"\x00"*16)
+
+	sequential, _=_Build(folder, 0)
+	parallel, scanned=_Build(folder, 2)
+
+	assert scanned==3
+	assert parallel.worlds==sequential.worlds
+	assert sorted(parallel.errors)==sorted(sequential.errors)==["broken.world00p"]
+	assert parallel.worlds["small.world00p"]["surface_count"]==40
+	assert parallel.largestWorlds(count=1)==["medium.world00p"]
\ No newline at end of file
@@ -0,0 +1,69 @@
+import numpy as np
+
+from mathutils import Vector
+from io_scene_jupex import lithtech_ascii, lta_format
+
+# CalculateOpqArray works at double precision while CalculateOpq rounds to single precision at every step like mathutils does,
+# so the two only agree to about what a float keeps, not bit for bit
+
+_TextureSize=128.0
+
+def _Polygons(count):
+	rng=np.random.RandomState(7)
+
+	verts=rng.uniform(-2000.0, 2000.0, (count, 3, 3))
+	uvs=rng.uniform(-4.0, 4.0, (count, 3, 2))
+
+	# a zero area UV triangle the per polygon version can't solve
+	uvs[0]=((0.5, 0.5), (0.5, 0.5), (1.0, 1.0))
+
+	return verts, uvs
+
+def _OldOpq(verts, uvs):
+	try:
+		opq=lithtech_ascii.CalculateOpq(*[Vector(i) for i in verts], *[Vector(i) for i in uvs], _TextureSize, _TextureSize)
+	except (ZeroDivisionError, ValueError):
+		return None
+
+	return np.array([list(row) for row in opq.matrix])
+
+def test_array_version_matches_per_polygon_version():
+	verts, uvs=_Polygons(256)
+	o, p, q, degenerate=lta_format.CalculateOpqArray(verts, uvs, _TextureSize, _TextureSize)
+
+	for i in range(len(verts)):
+		expected=_OldOpq(verts[i], uvs[i])
+
+		if expected is None:
+			assert degenerate[i]
+			continue
+
+		assert not degenerate[i]
+
+		scale=np.abs(expected).max()
+		np.testing.assert_allclose(np.array([o[i], p[i], q[i]]), expected, rtol=1e-4, atol=scale*1e-5)
+
+def test_unsolvable_polygons_are_zeroed():
+	verts, uvs=_Polygons(4)
+	o, p, q, degenerate=lta_format.CalculateOpqArray(verts, uvs, _TextureSize, _TextureSize)
+
+	assert degenerate.tolist()==[True, False, False, False]
+	assert not o[0].any() and not p[0].any() and not q[0].any()
+
+def test_polyhedron_cache_stays_under_its_limit():
+	cache=lithtech_ascii.PolyhedronCache(max_bytes=100)
+
+	cache.store("a", 1, 0, ("x"*40, 0))
+	cache.store("b", 2, 0, ("x"*40, 0))
+	assert cache.get("a", 1, 0) is not None # a is now the most recently used
+
+	cache.store("c", 3, 0, ("x"*40, 0))
+
+	assert cache.size==80
+	assert cache.get("b", 2, 0) is None
+	assert cache.get("a", 1, 0) is not None
+	assert cache.get("c", 3, 0) is not None
+
+	cache.store("d", 4, 0, ("x"*200, 0))
+	assert cache.get("d", 4, 0) is None
+	assert cache.size==80
\ No newline at end of file
@@ -0,0 +1,52 @@
+import numpy as np
+
+from io_scene_jupex.MeshBuilder import WeldVertices
+
+# welding has to find every pair within the distance, wherever the pair sits relative to the cells it's sorted into
+
+def test_pairs_either_side_of_a_cell_boundary_are_welded():
+	positions=np.array([
+		(0.00499, 0.0, 0.0), (0.00501, 0.0, 0.0), # either side of a rounding boundary at a distance of 0.01
+		(0.0199, 0.0199, 0.0199), (0.0201, 0.0201, 0.0201), # either side of a boundary on every axis
+		(5.0, 5.0, 5.0),
+	], dtype=np.float32)
+
+	kept, loops, removed=WeldVertices(positions, np.arange(5), 0.01)
+
+	assert removed==2
+	assert loops.tolist()==[0, 0, 1, 1, 2]
+	assert np.array_equal(kept, positions[[0, 2, 4]]) # the first vertex of each group stays, in order
+
+def test_pairs_further_apart_are_kept():
+	positions=np.array([(0.0, 0.0, 0.0), (0.011, 0.0, 0.0), (0.0, 0.008, 0.008)], dtype=np.float32)
+
+	_, _, removed=WeldVertices(positions, np.arange(3), 0.01)
+
+	assert removed==0
+
+def test_attributes_have_to_match_too():
+	positions=np.zeros((3, 3), dtype=np.float32)
+	normals=np.array([(0.0, 0.0, 1.0), (0.0, 0.005, 1.0), (0.0, 1.0, 0.0)], dtype=np.float32)
+
+	_, loops, removed=WeldVertices(positions, np.arange(3), 0.01, [(normals, 0.01)])
+
+	assert removed==1
+	assert loops.tolist()==[0, 0, 1]
+
+def test_matches_every_pair_within_the_distance():
+	rng=np.random.RandomState(3)
+	positions=rng.uniform(0.0, 1.0, (400, 3)).astype(np.float32)
+
+	_, loops, removed=WeldVertices(positions, np.arange(400), 0.05)
+
+	# groups from checking every pair, joined until nothing changes
+	close=np.sum((positions[:, None]-positions[None])**2, axis=2)<=0.05*0.05
+	labels=np.arange(400)
+	while True:
+		joined=np.array([labels[row].min() for row in close])
+		if np.array_equal(joined, labels):
+			break
+		labels=joined
+
+	assert removed==400-len(np.unique(labels))
+	assert np.array_equal(np.unique(loops, return_inverse=True)[1], np.unique(labels, return_inverse=True)[1])
\ No newline at end of file
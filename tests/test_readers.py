@@ -0,0 +1,79 @@
+import os
+import json
+import pytest
+
+import Fixtures
+from io_scene_jupex import WorldSummary
+
+# every fixture world is decoded by the same readers the importer uses and checked against its stored summary
+# the thresholds are minimum items per second per section, set well below what the readers manage so only real slowdowns trip them
+
+_GoldenFolder=os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+_SummariesPath=os.path.join(_GoldenFolder, "summaries.json")
+_ThresholdsPath=os.path.join(_GoldenFolder, "thresholds.json")
+
+# the best of a few runs, so a single hiccup doesn't count as a slowdown
+_TimingRuns=3
+
+def _Load(path):
+	with open(path, "r") as f:
+		return json.load(f)
+
+@pytest.fixture(scope="module")
+def worlds(tmp_path_factory):
+	return Fixtures.WriteWorlds(str(tmp_path_factory.mktemp("worlds")))
+
+@pytest.fixture(scope="module")
+def golden(request):
+	if request.config.getoption("--update-golden") or not os.path.exists(_SummariesPath):
+		return {}
+
+	return _Load(_SummariesPath)
+
+@pytest.fixture(scope="module", autouse=True)
+def store_golden(request, worlds):
+	yield
+
+	if request.config.getoption("--update-golden"):
+		summaries={name: WorldSummary.WithoutTimings(WorldSummary.SummarizeWorld(path, game_id)) for name, (game_id, path) in worlds.items()}
+
+		with open(_SummariesPath, "w") as f:
+			json.dump(summaries, f, indent="\t", sort_keys=True)
+
+@pytest.mark.parametrize("name", sorted(Fixtures.Worlds))
+def test_decoding_matches_golden(name, worlds, golden, request):
+	if request.config.getoption("--update-golden"):
+		pytest.skip("storing golden summaries")
+
+	assert name in golden, "no golden summary for {}, run with --update-golden".format(name)
+
+	game_id, path=worlds[name]
+	current=WorldSummary.SummarizeWorld(path, game_id)
+
+	assert WorldSummary.CompareSummaries(golden[name], current)==[]
+
+@pytest.mark.parametrize("name", sorted(Fixtures.Worlds))
+def test_throughput_above_threshold(name, worlds):
+	thresholds=_Load(_ThresholdsPath).get(name)
+	if thresholds is None:
+		pytest.skip("no thresholds for {}".format(name))
+
+	game_id, path=worlds[name]
+
+	best={}
+	for _ in range(_TimingRuns):
+		for section, result in WorldSummary.SummarizeWorld(path, game_id).items():
+			best[section]=max(best.get(section, 0.0), result["per_second"])
+
+	assert WorldSummary.CheckThroughput({section: {"per_second": per_second} for section, per_second in best.items()}, thresholds)==[]
+
+def test_golden_summaries_are_meaningful(golden):
+	if len(golden)==0:
+		pytest.skip("no golden summaries yet")
+
+	small=golden["small.world00p"]
+
+	assert small["render_surfaces"]["count"]==40
+	assert small["world_models"]["count"]==8
+	assert small["objects"]["count"]==64
+	assert golden["models.wld"]["world_models"]["count"]==64
\ No newline at end of file
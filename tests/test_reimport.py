@@ -0,0 +1,163 @@
+import io
+import math
+import types
+
+import numpy as np
+
+import Fixtures
+import BlenderStubs
+from io_scene_jupex import WorldModels, WorldObjects
+from io_scene_jupex.Reimport import ReimportIndex, WorldCollection
+
+# importing the same objects again has to reuse everything, names that repeat included
+
+def _Section():
+	return Fixtures.ObjectSection([
+		Fixtures.Light("LightPoint", "Lamp", (0.0, 0.0, 0.0), 256.0, (1.0, 0.5, 0.25)),
+		Fixtures.Light("LightPoint", "Lamp", (64.0, 0.0, 0.0), 256.0, (1.0, 0.5, 0.25)),
+		Fixtures.Light("LightSpot", "Spot", (0.0, 64.0, 0.0), 512.0, (1.0, 1.0, 1.0), 30.0),
+		Fixtures.Light("LightDirectional", "Sun", (0.0, 0.0, 512.0), 10000.0, (1.0, 1.0, 0.9)),
+		Fixtures.WorldModelObject("WorldModel", "Door", (0.0, 0.0, 0.0)),
+		Fixtures.WorldModelObject("WorldModel", "Door", (128.0, 0.0, 0.0)),
+	])
+
+def _Import(collection, section):
+	options=types.SimpleNamespace(ReimportIndex=ReimportIndex(collection), WorldCollection=collection, WorldModelIndex={})
+	WorldObjects.ReadObjects(io.BytesIO(section), options)
+
+	return options.ReimportIndex
+
+def test_objects_imported_twice_are_reused():
+	collection=BlenderStubs.data.collections.new("World")
+	section=_Section()
+
+	first=_Import(collection, section)
+	objects=list(collection.all_objects)
+
+	assert first.rebuilt==6
+	assert len(objects)==6
+
+	second=_Import(collection, section)
+
+	assert second.reused==6
+	assert second.rebuilt==0
+	assert second.removed==0
+	assert list(collection.all_objects)==objects
+
+def test_repeated_names_get_their_own_objects():
+	collection=BlenderStubs.data.collections.new("World")
+	_Import(collection, _Section())
+
+	lamps=[obj for obj in collection.all_objects if obj.name=="Lamp"]
+
+	assert len(lamps)==2
+	assert lamps[0]["jupex_key"]!=lamps[1]["jupex_key"]
+	assert lamps[0].data is lamps[1].data # same settings, one light datablock
+
+def test_sun_strength_ignores_the_radius():
+	collection=BlenderStubs.data.collections.new("World")
+	_Import(collection, _Section())
+
+	lights={obj.name: obj.data for obj in collection.all_objects if obj.type=="LIGHT"}
+
+	assert lights["Sun"].energy==WorldObjects._SunStrength
+	assert lights["Lamp"].energy==256.0
+
+def test_kept_objects_survive_prune():
+	collection=BlenderStubs.data.collections.new("World")
+	_Import(collection, _Section())
+
+	index=ReimportIndex(collection)
+	index.keep("light:0:Lamp")
+	index.prune("light:")
+
+	assert index.removed==3
+	assert [obj.name for obj in collection.all_objects if obj.type=="LIGHT"]==["Lamp"]
+
+def _ImportWorld(scene, source, section, reimport):
+	collection=WorldCollection(scene, source, source, reimport)
+
+	options=types.SimpleNamespace(ReimportIndex=ReimportIndex(collection if reimport else None), WorldCollection=collection, WorldModelIndex={})
+	WorldObjects.ReadObjects(io.BytesIO(section), options)
+
+	return collection
+
+def test_reimport_only_touches_its_own_world():
+	scene=BlenderStubs.data.collections.new("Scene")
+	other=Fixtures.ObjectSection([
+		Fixtures.Light("LightPoint", "Lamp", (0.0, 0.0, 0.0), 128.0, (1.0, 1.0, 1.0)),
+		Fixtures.Light("LightPoint", "Other Lamp", (32.0, 0.0, 0.0), 128.0, (1.0, 1.0, 1.0)),
+	])
+
+	world_a=_ImportWorld(scene, "a.world00p", _Section(), False)
+	world_b=_ImportWorld(scene, "b.world00p", other, False)
+	b_objects=list(world_b.all_objects)
+
+	again=_ImportWorld(scene, "a.world00p", _Section(), True)
+
+	assert again is world_a
+	assert len(list(scene.children))==2
+	assert list(world_b.all_objects)==b_objects
+	assert all(obj in BlenderStubs.data.objects for obj in b_objects)
+	assert len(list(world_a.all_objects))==6
+
+def _ImportWorldModels(collection, data):
+	options=types.SimpleNamespace(ReimportIndex=ReimportIndex(collection), WorldCollection=collection, WorldModelIndex={}, Geometry=None)
+
+	file=io.BytesIO(data)
+	file.seek(56)
+	WorldModels.WorldModelSection().read(file, 399, options)
+
+	return options
+
+# the stubs have no bmesh to build the mesh with, only the object matters here
+def _TestWorldModel(model, collection):
+	mesh_obj=BlenderStubs.data.objects.new(model.names[0], BlenderStubs.data.meshes.new("BSP"))
+	collection.objects.link(mesh_obj)
+
+	return mesh_obj
+
+def test_unchanged_world_models_are_not_decoded(monkeypatch):
+	monkeypatch.setattr(WorldModels, "TestWorldModel", _TestWorldModel)
+	collection=BlenderStubs.data.collections.new("World")
+	data=Fixtures.World00p(3, 4, 0, 0)
+
+	first=_ImportWorldModels(collection, data)
+	assert first.ReimportIndex.rebuilt==4
+
+	def read(self, file):
+		raise AssertionError("decoded {}".format(self.names[0]))
+
+	monkeypatch.setattr(WorldModels.WorldModel, "read", read)
+	second=_ImportWorldModels(collection, data)
+
+	assert second.ReimportIndex.reused==4
+	assert second.WorldModelIndex.keys()==first.WorldModelIndex.keys()
+
+# where a light shines in Blender's axes, Blender lights shine down their local -Z
+def _Direction(light_obj):
+	w, x, y, z=light_obj.rotation_quaternion
+	rotation=np.array([
+		[1-2*(y*y+z*z), 2*(x*y-w*z), 2*(x*z+w*y)],
+		[2*(x*y+w*z), 1-2*(x*x+z*z), 2*(y*z-w*x)],
+		[2*(x*z-w*y), 2*(y*z+w*x), 1-2*(x*x+y*y)],
+	])
+
+	return rotation@(0.0, 0.0, -1.0)
+
+def test_spot_lights_shine_along_their_forward_axis():
+	half=math.sqrt(0.5)
+	section=Fixtures.ObjectSection([
+		Fixtures.Light("LightSpot", "Forward", (0.0, 0.0, 0.0), 256.0, (1.0, 1.0, 1.0), 30.0),
+		Fixtures.Light("LightSpot", "Turned", (0.0, 0.0, 0.0), 256.0, (1.0, 1.0, 1.0), 30.0, (0.0, half, 0.0, half)), # +Z yawed onto +X
+		Fixtures.Light("LightDirectional", "Down", (0.0, 0.0, 0.0), 256.0, (1.0, 1.0, 1.0), None, (half, 0.0, 0.0, half)), # +Z pitched onto -Y
+	])
+
+	collection=BlenderStubs.data.collections.new("World")
+	_Import(collection, section)
+
+	lights={obj.name: obj for obj in collection.all_objects}
+
+	np.testing.assert_allclose(_Direction(lights["Forward"]), (0.0, 1.0, 0.0), atol=1e-6)
+	np.testing.assert_allclose(_Direction(lights["Turned"]), (1.0, 0.0, 0.0), atol=1e-6)
+	np.testing.assert_allclose(_Direction(lights["Down"]), (0.0, 0.0, -1.0), atol=1e-6)
\ No newline at end of file
@@ -0,0 +1,13 @@
+import BlenderStubs
+from io_scene_jupex import RenderMeshes
+
+# the template materials only live for the length of an import
+
+def test_templates_are_removed_after_import():
+	template=BlenderStubs.data.materials.new("Template Default.fx")
+	RenderMeshes._MaterialTemplates[("Default.fx", ("tDiffuseMap",))]=template
+
+	RenderMeshes.RemoveMaterialTemplates()
+
+	assert template not in BlenderStubs.data.materials
+	assert RenderMeshes._MaterialTemplates=={}
\ No newline at end of file
@@ -0,0 +1,65 @@
+import struct
+
+import BlenderStubs
+from io_scene_jupex import TextureBudget
+
+# only proxies Blender actually has in memory count, and the least recently used of those go first
+
+def _Proxy(name):
+	image=BlenderStubs.data.images.new(name)
+	image[TextureBudget._SourceProperty]=name+".dds"
+	image[TextureBudget._ProxyProperty]=name+".png"
+
+	return image
+
+def _Budget(budget_bytes, images):
+	budget=TextureBudget.TextureBudget(budget_bytes, 256, "")
+	for image, size in images:
+		budget.loaded[image.name]=size
+
+	return budget
+
+def test_proxy_size_comes_from_the_png_header(tmp_path):
+	path=str(tmp_path/"proxy.png")
+	with open(path, "wb") as f:
+		f.write(b"\x89PNG\r\n\x1a\n"+struct.pack(">I4s2I", 13, b"IHDR", 256, 128)+bytes(5))
+
+	assert TextureBudget._PngSize(path)==(256, 128)
+
+def test_images_not_in_memory_dont_count():
+	images=[(_Proxy(name), 100) for name in "abc"]
+	budget=_Budget(150, images)
+
+	images[2][0].has_data=True
+	budget.enforce()
+
+	assert budget.used_bytes==100
+	assert budget.evicted==0
+
+def test_least_recently_used_are_freed_past_the_budget():
+	images=[_Proxy(name) for name in "abc"]
+	budget=_Budget(150, [(image, 100) for image in images])
+
+	for image in images:
+		image.has_data=True
+
+	budget.enforce()
+
+	assert [image.has_data for image in images]==[False, False, True]
+	assert budget.used_bytes==100
+
+	# drawn again since, so it's now the most recently used
+	images[0].has_data=True
+	images[1].has_data=True
+	budget.enforce()
+
+	assert [image.has_data for image in images]==[False, True, False]
+
+def test_removed_images_are_forgotten():
+	image=_Proxy("a")
+	budget=_Budget(150, [(image, 100)])
+
+	BlenderStubs.data.images.remove(image)
+
+	assert budget.used_bytes==0
+	assert len(budget.loaded)==0
\ No newline at end of file
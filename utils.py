@@ -1,5 +1,7 @@
 import os
 import struct
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 def ReadRaw(file, format):
 	buf=struct.unpack(format, file.read(struct.calcsize(format)))
@@ -13,4 +15,38 @@ def ReadLTString(file):
 	return file.read(struct.unpack("H", file.read(2))[0]).decode("ascii")
 	
 def ReadCString(buffer):
-	return buffer.split(b'\x00')[0].decode("ascii")
\ No newline at end of file
+	return buffer.split(b'\x00')[0].decode("ascii")
+
+# a bare stand-in for this package in worker processes, so importing one of its modules doesn't run __init__ and try to import bpy
+_WorkerBootstrap='''
+import sys, types
+
+if {package!r} not in sys.modules:
+	package=types.ModuleType({package!r})
+	package.__path__=[{path!r}]
+	sys.modules[{package!r}]=package
+'''
+
+# the readers import Blender's modules at the top, workers that only read headers get stand-ins that fail once anything from them is used
+_BlenderStandIns='''
+class Unavailable(object):
+	def __init__(self, *args, **kwargs):
+		raise RuntimeError("Blender isn't available in worker processes")
+
+def unavailable(name):
+	return Unavailable
+
+for name in ["bpy", "bpy_extras", "bmesh", "mathutils"]:
+	if name not in sys.modules:
+		module=types.ModuleType(name)
+		module.__getattr__=unavailable
+		sys.modules[name]=module
+'''
+
+def CreateWorkerPool(worker_count, blender_stand_ins=False):
+	bootstrap=_WorkerBootstrap.format(package=__package__, path=os.path.dirname(os.path.abspath(__file__)))
+
+	if blender_stand_ins:
+		bootstrap+=_BlenderStandIns
+
+	return ProcessPoolExecutor(worker_count, mp_context=multiprocessing.get_context("spawn"), initializer=exec, initargs=(bootstrap, {}))
\ No newline at end of file